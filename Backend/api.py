@@ -1,27 +1,43 @@
 import os
 import json
+import asyncio
 import base64
+import hashlib
+import html
 import secrets
+import shutil
+import tempfile
+import threading
+import time
 import ipaddress
+import re
+from contextlib import asynccontextmanager
 from pathlib import Path
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
 from enum import Enum
-from typing import List, Optional, Dict, Sequence, Any, Tuple
+from typing import AsyncIterator, List, Optional, Dict, Sequence, Any, Tuple
 from datetime import timezone as dt_timezone, timedelta
 from zoneinfo import ZoneInfo
 from urllib.parse import urlparse
 
+from cachetools import TTLCache
+
 import email
-from email.header import decode_header
+from email import policy
+from email.header import decode_header, make_header
 from email.utils import parseaddr
 from email.message import EmailMessage
 
-from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi import BackgroundTasks, Depends, FastAPI, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse
 from pydantic import BaseModel, ConfigDict
 
 from email_advising import (
+    AdvisorResponse,
     EmailAdvisor,
     TfidfRetriever,
     KnowledgeArticle,
@@ -31,7 +47,6 @@ from email_advising import (
 )
 
 from sqlalchemy import (
-    create_engine,
     Column,
     Integer,
     String,
@@ -39,16 +54,32 @@ from sqlalchemy import (
     DateTime,
     Text,
     Enum as SAEnum,
+    event,
     func,
+    select,
     Boolean,
+    Index,
+    and_,
+    bindparam,
+    case,
+    or_,
+    insert,
+    inspect,
+    lambda_stmt,
+    update,
 )
-from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 # Gmail / OAuth
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request as GoogleAuthRequest
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from googleapiclient.http import _should_retry_response
 
 # =====================================================
 # Environment validation
@@ -103,14 +134,29 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 # Validate environment on startup
 validate_environment()
 
-# In-memory store for OAuth flows keyed by state, with expiration
-oauth_flows: Dict[str, Tuple[Flow, datetime]] = {}
+# In-memory store for OAuth flows keyed by state; abandoned flows expire after 10 minutes
+OAUTH_STATE_TTL_SECONDS = 600
+oauth_flows: "TTLCache[str, Flow]" = TTLCache(maxsize=256, ttl=OAUTH_STATE_TTL_SECONDS)
+# TTLCache is not thread-safe and the OAuth endpoints run in the threadpool
+oauth_flows_lock = threading.Lock()
 
 # =====================================================
 # FastAPI app + CORS
 # =====================================================
 
-app = FastAPI(title="Email Advising System API")
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create tables (and indexes) if they don't exist yet, before serving requests."""
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+    yield
+
+
+app = FastAPI(
+    title="Email Advising System API",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -129,6 +175,27 @@ reference_corpus = load_reference_corpus()
 retriever = TfidfRetriever(reference_corpus)
 advisor = EmailAdvisor(knowledge_base, retriever=retriever)
 
+# Advisor scoring is pure CPU; run it off the event loop on a bounded pool
+ADVISOR_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="advisor")
+
+
+async def run_advisor(query: str, metadata: Optional[Dict[str, Any]] = None) -> AdvisorResponse:
+    """Run ``advisor.process_query`` on ADVISOR_POOL without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        ADVISOR_POOL, partial(advisor.process_query, query, metadata)
+    )
+
+
+async def run_advisor_batch(
+    queries: List[str], metadatas: List[Optional[Dict[str, Any]]]
+) -> List[AdvisorResponse]:
+    """Run ``advisor.process_queries`` on ADVISOR_POOL (one TF-IDF pass for the batch)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        ADVISOR_POOL, partial(advisor.process_queries, queries, metadatas)
+    )
+
 
 # =====================================================
 # Knowledge Base CRUD endpoints
@@ -610,13 +677,30 @@ def fetch_url_content(req: FetchURLRequest):
 # Database setup (SQLite + SQLAlchemy)
 # =====================================================
 
-DATABASE_URL = "sqlite:///./emails.db"  # file in Backend directory
+DATABASE_URL = "sqlite+aiosqlite:///./emails.db"  # file in Backend directory
 
-engine = create_engine(
+engine = create_async_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},  # needed for SQLite + threads
+    poolclass=AsyncAdaptedQueuePool,  # aiosqlite defaults to NullPool (a new connection per session)
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=True,
 )
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """WAL lets readers proceed while ingest/sync is writing; the rest trims I/O per query."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MiB page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    cursor.close()
+
+
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 # =====================================================
@@ -662,6 +746,35 @@ class Email(BaseModel):
     received_at: datetime
     approved_at: Optional[datetime] = None
 
+    model_config = ConfigDict(from_attributes=True)
+
+
+class EmailListItem(BaseModel):
+    """
+    Email as shown in list views: everything except body and suggested_reply.
+    Fetch GET /emails/{id} for the full object.
+    """
+    id: int
+    student_name: Optional[str] = None
+    uni: Optional[str] = None
+    email_address: Optional[str] = None
+    subject: str
+    confidence: float
+    status: EmailStatus
+    received_at: datetime
+    approved_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class EmailPage(BaseModel):
+    """
+    One page of emails, newest first.
+    Pass next_cursor back as ?cursor= to get the following page (None on the last page).
+    """
+    items: List[EmailListItem]
+    next_cursor: Optional[str] = None
+
 
 class EmailUpdate(BaseModel):
     """
@@ -743,6 +856,29 @@ class EmailORM(Base):
     suggested_reply = Column(Text, nullable=False)
     received_at = Column(DateTime, nullable=False, index=True)
     approved_at = Column(DateTime, nullable=True)  # when advisor approved/sent
+    # blake2b-128 of subject + body, for duplicate detection during Gmail sync
+    content_hash = Column(
+        String(32),
+        nullable=True,
+        index=True,
+        default=lambda ctx: email_content_hash(
+            ctx.get_current_parameters()["subject"],
+            ctx.get_current_parameters()["body"],
+        ),
+    )
+    gmail_message_id = Column(String, nullable=True, index=True)  # set for emails pulled from Gmail
+
+    __table_args__ = (
+        # Backs /emails?status=... ORDER BY received_at DESC and the per-status /metrics counts
+        Index("ix_emails_status_received_at", "status", "received_at"),
+    )
+
+
+def email_content_hash(subject: str, body: str) -> str:
+    """Hex blake2b-128 digest identifying an email's content (subject + body)."""
+    return hashlib.blake2b(
+        f"{subject}\x00{body}".encode("utf-8"), digest_size=16
+    ).hexdigest()
 
 
 class EmailAssignmentORM(Base):
@@ -759,22 +895,80 @@ class EmailAssignmentORM(Base):
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
-# Create tables if they don't exist yet
-Base.metadata.create_all(bind=engine)
+def emails_by_status_stmt(status: Optional[EmailStatus]):
+    """SELECT emails (optionally filtered by status), newest first, as a cached lambda statement."""
+    stmt = lambda_stmt(lambda: select(EmailORM))
+    if status is not None:
+        stmt += lambda s: s.where(EmailORM.status == status)
+    stmt += lambda s: s.order_by(EmailORM.received_at.desc())
+    return stmt
+
+
+def add_missing_email_columns(connection) -> None:
+    """ALTER TABLE emails for columns added after the table was created (and backfill hashes)."""
+    table = EmailORM.__table__
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            )
+
+    if "content_hash" not in existing:
+        rows = connection.execute(select(table.c.id, table.c.subject, table.c.body)).all()
+        if rows:
+            connection.execute(
+                table.update()
+                .where(table.c.id == bindparam("row_id"))
+                .values(content_hash=bindparam("row_hash")),
+                [
+                    {"row_id": row.id, "row_hash": email_content_hash(row.subject, row.body)}
+                    for row in rows
+                ],
+            )
+
+
+def create_schema(connection) -> None:
+    """Create missing tables, plus any columns/indexes added since an existing table was created."""
+    Base.metadata.create_all(connection)
+    add_missing_email_columns(connection)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
 
 # =====================================================
 # Gmail OAuth helpers
 # =====================================================
 
 
+# Last successfully loaded (mtime_ns, creds, email_address); swapped as one tuple
+# so threadpool readers never see a half-updated entry
+_creds_cache: Optional[Tuple[int, Credentials, Optional[str]]] = None
+
+
+def invalidate_gmail_credentials_cache() -> None:
+    global _creds_cache
+    _creds_cache = None
+
+
 def load_gmail_credentials() -> tuple[Optional[Credentials], Optional[str]]:
     """
     Load stored Gmail OAuth credentials (if any).
     Returns (creds, email_address).
+    The token file is only re-read when its mtime changes or the cached creds expire.
     """
-    if not GMAIL_TOKEN_PATH.exists():
+    global _creds_cache
+    try:
+        mtime = GMAIL_TOKEN_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
         return None, None
 
+    cached = _creds_cache
+    if cached is not None and cached[0] == mtime and cached[1].valid:
+        return cached[1], cached[2]
+
     with GMAIL_TOKEN_PATH.open("r") as f:
         data = json.load(f)
 
@@ -798,6 +992,12 @@ def load_gmail_credentials() -> tuple[Optional[Credentials], Optional[str]]:
         else:
             return None, email_address
 
+    try:
+        # Re-stat: a refresh above rewrites the file
+        mtime = GMAIL_TOKEN_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return creds, email_address
+    _creds_cache = (mtime, creds, email_address)
     return creds, email_address
 
 
@@ -808,12 +1008,32 @@ def save_gmail_credentials(creds: Credentials, email_address: str) -> None:
     data = json.loads(creds.to_json())
     data["email_address"] = email_address
     GMAIL_TOKEN_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with GMAIL_TOKEN_PATH.open("w") as f:
-        json.dump(data, f)
-
-
-def get_or_create_settings(db: Session) -> EmailSettingsORM:
-    settings = db.query(EmailSettingsORM).first()
+    # Serialize up front so the file is written in one call (json.dump issues a
+    # write per chunk), then swap it in atomically so readers never see a partial token.
+    # Each save gets its own temp file: concurrent refreshes (sync + auto-send) must not
+    # replace each other's temp file out from under them.
+    with tempfile.NamedTemporaryFile(
+        "w",
+        encoding="utf-8",
+        dir=GMAIL_TOKEN_PATH.parent,
+        prefix=GMAIL_TOKEN_PATH.name + ".",
+        suffix=".tmp",
+        delete=False,
+    ) as tmp:
+        tmp.write(json.dumps(data))
+    try:
+        if GMAIL_TOKEN_PATH.exists():
+            # Keep e.g. a chmod 600 on the token across the replace
+            shutil.copymode(GMAIL_TOKEN_PATH, tmp.name)
+        os.replace(tmp.name, GMAIL_TOKEN_PATH)
+    except BaseException:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+    invalidate_gmail_credentials_cache()
+
+
+async def get_or_create_settings(db: AsyncSession) -> EmailSettingsORM:
+    settings = (await db.execute(select(EmailSettingsORM).limit(1))).scalar_one_or_none()
     if settings is None:
         settings = EmailSettingsORM(
             email_address="",
@@ -827,32 +1047,186 @@ def get_or_create_settings(db: Session) -> EmailSettingsORM:
             auto_send_threshold=CONFIDENCE_THRESHOLD,
         )
         db.add(settings)
-        db.commit()
-        db.refresh(settings)
+        await db.commit()
+        await db.refresh(settings)
     return settings
 
 
-def extract_text_from_email(msg: email.message.Message) -> str:
-    """Return the plain-text body from an email.message.Message"""
-    if msg.is_multipart():
-        for part in msg.walk():
-            ctype = part.get_content_type()
-            disp = str(part.get("Content-Disposition") or "")
-            if ctype == "text/plain" and "attachment" not in disp:
-                charset = part.get_content_charset() or "utf-8"
-                try:
-                    return part.get_payload(decode=True).decode(
-                        charset, errors="ignore"
-                    )
-                except Exception:
-                    continue
-        return ""
-    else:
-        charset = msg.get_content_charset() or "utf-8"
-        try:
-            return msg.get_payload(decode=True).decode(charset, errors="ignore")
-        except Exception:
+# Read-only snapshot of the single email_settings row. Cleared by every settings
+# write, which also bumps the generation: a read that started before the write may
+# resume after it with the old row, and must not store that stale snapshot.
+_settings_cache: Optional[EmailSettings] = None
+_settings_generation = 0
+
+
+async def get_settings_snapshot(db: AsyncSession) -> EmailSettings:
+    """Cached settings for read-only callers (ingest, auto-send, settings GET)."""
+    global _settings_cache
+    cached = _settings_cache
+    if cached is None:
+        generation = _settings_generation
+        cached = EmailSettings.model_validate(await get_or_create_settings(db))
+        if generation == _settings_generation:
+            _settings_cache = cached
+    return cached
+
+
+def invalidate_settings_cache() -> None:
+    global _settings_cache, _settings_generation
+    _settings_generation += 1
+    _settings_cache = None
+
+
+_CHARSET_RE = re.compile(r'charset\s*=\s*"?([^";\s]+)', re.IGNORECASE)
+
+
+def gmail_headers(payload: Dict[str, Any]) -> Dict[str, str]:
+    """{lowercased header name: value} for a Gmail API message payload (first value wins)."""
+    headers: Dict[str, str] = {}
+    for header in payload.get("headers", ()):
+        headers.setdefault(header["name"].lower(), header["value"])
+    return headers
+
+
+def decode_mime_header(value: str) -> str:
+    """Decode RFC 2047 encoded-words if Gmail left any in a header value."""
+    if "=?" not in value:
+        return value
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def parse_sender(value: str) -> Tuple[str, str]:
+    """
+    (display name, address) from a raw From header value.
+    The address is parsed before any RFC 2047 decoding so that a decoded name
+    (``"Doe, John"``, or one that looks like an address) can't change which
+    address is picked; only the display name is decoded afterwards.
+    """
+    name, address = parseaddr(value)
+    return decode_mime_header(name), address
+
+
+def _decode_part_data(part: Dict[str, Any]) -> Optional[str]:
+    data = part.get("body", {}).get("data")
+    if data is None:
+        return None
+    raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    match = _CHARSET_RE.search(gmail_headers(part).get("content-type", ""))
+    charset = match.group(1) if match else "utf-8"
+    try:
+        return raw.decode(charset, errors="ignore")
+    except LookupError:
+        return raw.decode("utf-8", errors="ignore")
+
+
+def _find_plain_part(part: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if part.get("mimeType") == "text/plain" and not part.get("filename"):
+        return part
+    for child in part.get("parts", ()):
+        found = _find_plain_part(child)
+        if found is not None:
+            return found
+    return None
+
+
+def extract_text_from_payload(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Plain-text body from a Gmail API ``format="full"`` payload.
+    Returns None when the text has to come from the raw message instead
+    (the text/plain part was too large to be inlined and only has an attachmentId).
+    """
+    part = _find_plain_part(payload)
+    if part is None:
+        if payload.get("parts"):
             return ""
+        # Single-part message that isn't text/plain: use its payload as-is
+        part = payload
+    text = _decode_part_data(part)
+    if text is None and part.get("body", {}).get("attachmentId"):
+        return None
+    return text or ""
+
+
+def extract_text_from_email(msg: EmailMessage) -> str:
+    """Return the plain-text body from a message parsed with ``policy.default``"""
+    part = msg.get_body(preferencelist=("plain",))
+    if part is None and not msg.is_multipart():
+        # Single-part message that isn't text/plain: use its payload as-is
+        part = msg
+    if part is None:
+        return ""
+    try:
+        content = part.get_content()
+    except Exception:
+        return ""
+    return content if isinstance(content, str) else ""
+
+
+@lru_cache(maxsize=1)
+def gmail_discovery_document() -> Optional[Dict[str, Any]]:
+    """Parsed Gmail v1 discovery document bundled with googleapiclient (None if missing)."""
+    document = get_static_doc("gmail", "v1")
+    return json.loads(document) if document else None
+
+
+def gmail_service(creds: Credentials):
+    """
+    Build a Gmail API client for *creds*.
+    Reuses the pre-parsed discovery document instead of re-reading and parsing it
+    on every call. Each client still gets its own HTTP transport because httplib2
+    connections are not thread-safe, and Gmail calls run in the threadpool.
+    """
+    document = gmail_discovery_document()
+    if document is None:
+        return build("gmail", "v1", credentials=creds)
+    return build_from_document(document, credentials=creds)
+
+
+# One Gmail client per worker thread, rebuilt when the credentials object changes
+# (load_gmail_credentials returns the same object until the token file changes)
+_thread_gmail = threading.local()
+
+
+def thread_gmail_service(creds: Credentials):
+    """
+    Gmail client owned by the calling thread, reused across calls so its HTTPS
+    connection stays open. Only for requests built and executed on this thread.
+    """
+    cached = getattr(_thread_gmail, "entry", None)
+    if cached is not None and cached[0] is creds:
+        return cached[1]
+    service = gmail_service(creds)
+    _thread_gmail.entry = (creds, service)
+    return service
+
+
+# Built once; {body} is filled with the escaped reply text (CSS braces are doubled)
+REPLY_HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body {{ font-family: 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; line-height: 1.5; color: #333; }}
+        p {{ margin: 0 0 1em 0; }}
+    </style>
+</head>
+<body>
+    {body}
+</body>
+</html>"""
+
+
+# Single-line replies up to this length go out as plain text only: the HTML part
+# would add nothing but font styling, and multi-line replies keep it for the <br>s
+PLAIN_REPLY_MAX_CHARS = 280
+
+
+def reply_needs_html(body: str) -> bool:
+    """Whether *body* should carry the HTML alternative (see PLAIN_REPLY_MAX_CHARS)."""
+    return len(body) > PLAIN_REPLY_MAX_CHARS or "\n" in body
 
 
 def send_email_via_gmail_api(
@@ -861,13 +1235,13 @@ def send_email_via_gmail_api(
     to_addr: str,
     subject: str,
     body: str,
+    html_alternative: bool = True,
 ) -> None:
     """
     Send email using Gmail API with proper HTML formatting.
-    Handles both plain text and HTML rendering.
+    Handles both plain text and HTML rendering; pass html_alternative=False
+    to send a single text/plain part.
     """
-    import html
-    
     msg = EmailMessage()
     msg["From"] = from_addr
     msg["To"] = to_addr
@@ -876,74 +1250,168 @@ def send_email_via_gmail_api(
     # Set plain text version
     msg.set_content(body)
     
-    # Create HTML version with proper formatting
-    # Escape HTML entities and convert newlines to <br> tags
-    escaped_body = html.escape(body)
-    html_body = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body {{ font-family: 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; line-height: 1.5; color: #333; }}
-        p {{ margin: 0 0 1em 0; }}
-    </style>
-</head>
-<body>
-    {escaped_body.replace(chr(10), '<br>')}
-</body>
-</html>"""
-    
-    msg.add_alternative(html_body, subtype="html")
+    if html_alternative:
+        # Escape HTML entities and convert newlines to <br> tags
+        html_body = REPLY_HTML_TEMPLATE.format(body=html.escape(body).replace("\n", "<br>"))
+        msg.add_alternative(html_body, subtype="html")
+
+    # Gmail accepts unpadded base64url
+    raw_b64 = base64.urlsafe_b64encode(msg.as_bytes()).rstrip(b"=").decode("ascii")
+
+    service = thread_gmail_service(creds)
+    execute_gmail_request(
+        service.users().messages().send(
+            userId="me",
+            body={"raw": raw_b64},
+        )
+    )
+
 
-    raw_bytes = msg.as_bytes()
-    raw_b64 = base64.urlsafe_b64encode(raw_bytes).decode("utf-8")
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until the bucket can cover
+    *cost*; costs larger than the capacity are paid off as a wait.
+    """
 
-    service = build("gmail", "v1", credentials=creds)
-    service.users().messages().send(
-        userId="me",
-        body={"raw": raw_b64},
-    ).execute()
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
 
+    def acquire(self, cost: float = 1) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
 
-# ---------- Utility: DB session + conversion ----------
 
-def get_db() -> Session:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def orm_to_schema(email_obj: EmailORM) -> Email:
-    return Email(
-        id=email_obj.id,
-        student_name=email_obj.student_name,
-        uni=email_obj.uni,
-        email_address=email_obj.email_address,
-        subject=email_obj.subject,
-        body=email_obj.body,
-        confidence=email_obj.confidence,
-        status=email_obj.status,
-        suggested_reply=email_obj.suggested_reply,
-        received_at=email_obj.received_at,
-        approved_at=email_obj.approved_at,
-    )
+# Gmail allows 250 quota units per user per second; keep a little headroom
+GMAIL_QUOTA_UNITS_PER_SECOND = 240
+GMAIL_QUOTA_COST = {"list": 5, "get": 5, "batchModify": 50, "send": 100, "getProfile": 1}
+GMAIL_NUM_RETRIES = 4
+gmail_quota = TokenBucket(GMAIL_QUOTA_UNITS_PER_SECOND, GMAIL_QUOTA_UNITS_PER_SECOND)
 
 
-def settings_orm_to_schema(settings: EmailSettingsORM) -> EmailSettings:
-    """Convert ORM model to Pydantic schema."""
-    return EmailSettings(
-        email_address=settings.email_address,
-        imap_server=settings.imap_server,
-        imap_port=settings.imap_port,
-        smtp_server=settings.smtp_server,
-        smtp_port=settings.smtp_port,
-        use_tls=settings.use_tls,
-        auto_send_enabled=settings.auto_send_enabled,
-        auto_send_threshold=settings.auto_send_threshold,
-        last_synced_at=settings.last_synced_at,
-    )
+def gmail_request_cost(request) -> int:
+    """Quota units for a Gmail request, from its method id (e.g. gmail.users.messages.get)."""
+    method = getattr(request, "methodId", "") or ""
+    return GMAIL_QUOTA_COST.get(method.rsplit(".", 1)[-1], 5)
+
+
+def is_retryable_gmail_error(exc: Exception) -> bool:
+    """
+    429, any 5xx, or a 403 rate-limit reason: the same rule googleapiclient
+    applies to single requests via execute(num_retries=...).
+    """
+    return isinstance(exc, HttpError) and _should_retry_response(exc.resp.status, exc.content)
+
+
+def gmail_backoff(attempt: int) -> float:
+    """Exponential backoff in seconds: 0.5, 1, 2, ... capped at 16."""
+    return min(16.0, 0.5 * 2 ** attempt)
+
+
+def execute_gmail_request(request) -> Dict[str, Any]:
+    """
+    Execute a single Gmail request under the shared quota bucket.
+    googleapiclient retries 429/5xx and 403 rate-limit responses itself with
+    exponential backoff.
+    """
+    gmail_quota.acquire(gmail_request_cost(request))
+    return request.execute(num_retries=GMAIL_NUM_RETRIES)
+
+
+async def gmail_execute(request) -> Dict[str, Any]:
+    """Execute a Gmail API request in the threadpool so it doesn't block the event loop."""
+    return await run_in_threadpool(execute_gmail_request, request)
+
+
+GMAIL_BATCH_LIMIT = 100  # max calls per Gmail batch HTTP request
+GMAIL_BATCH_MODIFY_LIMIT = 1000  # max ids per users.messages.batchModify
+GMAIL_MAX_CONCURRENT_BATCHES = 4  # batch requests in flight at once during a fetch
+GMAIL_MAX_CONCURRENT_SENDS = 5  # replies being sent at once during a sync
+
+
+async def gmail_get_messages(
+    creds: Credentials, msg_ids: Sequence[str], **get_kwargs
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch several messages with batched HTTP requests (up to 100 gets per round trip).
+    Up to GMAIL_MAX_CONCURRENT_BATCHES batches are in flight at once, each on its worker
+    thread's client (httplib2 connections are not thread-safe).
+    Gets rejected with 429/5xx or a 403 rate limit are retried with exponential backoff.
+    Returns {msg_id: message}; messages whose get failed are left out (and stay unread).
+    """
+    fetched: Dict[str, Dict[str, Any]] = {}
+    remaining = list(msg_ids)
+    semaphore = asyncio.Semaphore(GMAIL_MAX_CONCURRENT_BATCHES)
+
+    for attempt in range(GMAIL_NUM_RETRIES + 1):
+        retry: List[str] = []
+
+        def collect(request_id, response, exception):
+            if exception is not None:
+                if attempt < GMAIL_NUM_RETRIES and is_retryable_gmail_error(exception):
+                    retry.append(request_id)
+                    return
+                print(f"Failed to fetch Gmail message {request_id}: {exception}")
+                return
+            fetched[request_id] = response
+
+        def execute_batch(chunk: List[str]) -> None:
+            service = thread_gmail_service(creds)
+            batch = service.new_batch_http_request(callback=collect)
+            for msg_id in chunk:
+                batch.add(
+                    service.users().messages().get(userId="me", id=msg_id, **get_kwargs),
+                    request_id=msg_id,
+                )
+            gmail_quota.acquire(GMAIL_QUOTA_COST["get"] * len(chunk))
+            batch.execute()
+
+        async def run_batch(chunk: List[str]) -> None:
+            async with semaphore:
+                await run_in_threadpool(execute_batch, chunk)
+
+        await asyncio.gather(
+            *(
+                run_batch(remaining[start:start + GMAIL_BATCH_LIMIT])
+                for start in range(0, len(remaining), GMAIL_BATCH_LIMIT)
+            )
+        )
+
+        if not retry:
+            break
+        await asyncio.sleep(gmail_backoff(attempt))
+        remaining = retry
+    return fetched
+
+
+async def gmail_mark_read(service, msg_ids: Sequence[str]) -> None:
+    """Remove the UNREAD label from all *msg_ids* using batchModify (1000 ids per call)."""
+    for start in range(0, len(msg_ids), GMAIL_BATCH_MODIFY_LIMIT):
+        await gmail_execute(
+            service.users().messages().batchModify(
+                userId="me",
+                body={
+                    "ids": list(msg_ids[start:start + GMAIL_BATCH_MODIFY_LIMIT]),
+                    "removeLabelIds": ["UNREAD"],
+                },
+            )
+        )
+
+
+# ---------- Utility: DB session + conversion ----------
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with SessionLocal() as db:
+        yield db
 
 
 # =====================================================
@@ -952,34 +1420,29 @@ def settings_orm_to_schema(settings: EmailSettingsORM) -> EmailSettings:
 
 
 @app.get("/email-settings", response_model=EmailSettings)
-def read_email_settings():
-    db = SessionLocal()
-    try:
-        settings = get_or_create_settings(db)
-        return settings_orm_to_schema(settings)
-    finally:
-        db.close()
+async def read_email_settings(db: AsyncSession = Depends(get_db)):
+    return await get_settings_snapshot(db)
 
 
 @app.post("/email-settings", response_model=EmailSettings)
-def update_email_settings(payload: EmailSettingsUpdate):
-    db = SessionLocal()
-    try:
-        settings = get_or_create_settings(db)
-        data = payload.model_dump(exclude_unset=True)
+async def update_email_settings(
+    payload: EmailSettingsUpdate,
+    db: AsyncSession = Depends(get_db),
+):
+    settings = await get_or_create_settings(db)
+    data = payload.model_dump(exclude_unset=True)
 
-        for field, value in data.items():
-            if field == "app_password":
-                # Legacy: ignore or only update if you really want to keep it
-                continue
-            setattr(settings, field, value)
+    for field, value in data.items():
+        if field == "app_password":
+            # Legacy: ignore or only update if you really want to keep it
+            continue
+        setattr(settings, field, value)
 
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
-        return settings_orm_to_schema(settings)
-    finally:
-        db.close()
+    db.add(settings)
+    await db.commit()
+    await db.refresh(settings)
+    invalidate_settings_cache()
+    return EmailSettings.model_validate(settings)
 
 
 # =====================================================
@@ -987,30 +1450,20 @@ def update_email_settings(payload: EmailSettingsUpdate):
 # =====================================================
 
 
-def create_oauth_state() -> str:
-    """Generate cryptographically secure state token."""
-    return secrets.token_urlsafe(32)
-
-
-def validate_oauth_state(state: str) -> bool:
-    """Validate state token format and expiration."""
-    if state not in oauth_flows:
-        return False
+@lru_cache(maxsize=1)
+def _read_client_config(path: str, mtime_ns: int) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-    flow, expiry = oauth_flows[state]
-    if datetime.utcnow() > expiry:
-        oauth_flows.pop(state, None)
-        return False
 
-    return True
+def oauth_client_config() -> Dict[str, Any]:
+    """Parsed OAuth client secrets, re-read only when the file changes."""
+    return _read_client_config(CLIENT_SECRETS_FILE, os.stat(CLIENT_SECRETS_FILE).st_mtime_ns)
 
 
-def cleanup_expired_oauth_states():
-    """Remove expired OAuth states."""
-    now = datetime.utcnow()
-    expired = [state for state, (_, expiry) in oauth_flows.items() if now > expiry]
-    for state in expired:
-        oauth_flows.pop(state, None)
+def create_oauth_state() -> str:
+    """Generate cryptographically secure state token."""
+    return secrets.token_urlsafe(32)
 
 
 # =====================================================
@@ -1019,32 +1472,29 @@ def cleanup_expired_oauth_states():
 
 
 @app.get("/gmail/status")
-def gmail_status():
+async def gmail_status(db: AsyncSession = Depends(get_db)):
     """
     Return whether Gmail is connected, what address, and (optionally) last sync time.
     Used by Settings tab on load.
     """
-    db = SessionLocal()
-    try:
-        settings = get_or_create_settings(db)
-        creds, email_address = load_gmail_credentials()
-        connected = bool(creds and email_address)
+    settings = await get_or_create_settings(db)
+    creds, email_address = await run_in_threadpool(load_gmail_credentials)
+    connected = bool(creds and email_address)
 
-        # Keep email_settings.email_address in sync with Gmail profile
-        if connected and email_address and settings.email_address != email_address:
-            settings.email_address = email_address
-            db.add(settings)
-            db.commit()
+    # Keep email_settings.email_address in sync with Gmail profile
+    if connected and email_address and settings.email_address != email_address:
+        settings.email_address = email_address
+        db.add(settings)
+        await db.commit()
+        invalidate_settings_cache()
 
-        return {
-            "connected": connected,
-            "email_address": email_address or settings.email_address,
-            "last_synced_at": settings.last_synced_at.isoformat()
-            if settings.last_synced_at
-            else None,
-        }
-    finally:
-        db.close()
+    return {
+        "connected": connected,
+        "email_address": email_address or settings.email_address,
+        "last_synced_at": settings.last_synced_at.isoformat()
+        if settings.last_synced_at
+        else None,
+    }
 
 
 @app.get("/gmail/auth-url")
@@ -1060,8 +1510,8 @@ def gmail_auth_url():
             "Expected at GOOGLE_OAUTH_CLIENT_FILE or data/google_client_secrets.json",
         )
 
-    flow = Flow.from_client_secrets_file(
-        CLIENT_SECRETS_FILE,
+    flow = Flow.from_client_config(
+        oauth_client_config(),
         scopes=SCOPES,
         redirect_uri="http://127.0.0.1:8000/gmail/oauth2callback",
     )
@@ -1074,41 +1524,42 @@ def gmail_auth_url():
         state=state,
     )
 
-    # Store with 10-minute expiration
-    expiry = datetime.utcnow() + timedelta(minutes=10)
-    oauth_flows[state] = (flow, expiry)
+    # Store until used or expired (TTL)
+    with oauth_flows_lock:
+        oauth_flows[state] = flow
 
     return {"auth_url": auth_url}
 
 
 @app.get("/gmail/oauth2callback")
-def gmail_oauth2callback(request: Request, state: str, code: str):
+async def gmail_oauth2callback(request: Request, state: str, code: str):
     """
     OAuth redirect URI that Google calls with ?state=...&code=...
     Exchanges code for tokens, stores them, and then redirects user back to the frontend.
     """
     # Validate state token
-    if not validate_oauth_state(state):
+    with oauth_flows_lock:
+        flow = oauth_flows.get(state)
+    if flow is None:
         raise HTTPException(status_code=400, detail="Invalid or expired OAuth state")
 
-    flow, _ = oauth_flows[state]
-
     # Complete the OAuth flow
-    flow.fetch_token(code=code)
+    await run_in_threadpool(flow.fetch_token, code=code)
     creds: Credentials = flow.credentials
 
     # Use Gmail API to get the user's email address
-    service = build("gmail", "v1", credentials=creds)
-    profile = service.users().getProfile(userId="me").execute()
+    service = gmail_service(creds)
+    profile = await gmail_execute(service.users().getProfile(userId="me"))
     email_address = profile.get("emailAddress")
 
     if not email_address:
         raise HTTPException(status_code=400, detail="Unable to determine Gmail address")
 
-    save_gmail_credentials(creds, email_address)
+    await run_in_threadpool(save_gmail_credentials, creds, email_address)
 
     # Clean up the used state immediately after use
-    oauth_flows.pop(state, None)
+    with oauth_flows_lock:
+        oauth_flows.pop(state, None)
 
     # Redirect back to the frontend app
     redirect_url = FRONTEND_URL
@@ -1125,14 +1576,18 @@ def gmail_oauth2callback(request: Request, state: str, code: str):
 
 
 @app.post("/emails/ingest", response_model=Email)
-def ingest_email(email_in: EmailIn):
+async def ingest_email(
+    email_in: EmailIn,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
     """
     Simulate 'an email came into the advisor inbox'.
 
     1. Run the EmailAdvisor on the email body.
     2. Decide if it's auto or review based on confidence.
     3. Store it in SQLite.
-    4. If auto and settings enabled, send immediately.
+    4. If auto, queue the reply to be sent after the response (when settings allow).
     5. Return the stored email object.
     """
     received_at = email_in.received_at or datetime.utcnow()
@@ -1142,7 +1597,7 @@ def ingest_email(email_in: EmailIn):
         email_in.email_address = validate_and_normalize_email(email_in.email_address)
 
     # Run advisor on the body (what the student actually wrote)
-    result = advisor.process_query(
+    result = await run_advisor(
         email_in.body,
         {"student_name": email_in.student_name},
     )
@@ -1150,59 +1605,130 @@ def ingest_email(email_in: EmailIn):
     confidence = float(result.confidence or 0.0)
     suggested_reply = result.body
 
-    db = SessionLocal()
+    # Get user's threshold from settings
+    settings = await get_settings_snapshot(db)
+    threshold = settings.auto_send_threshold or CONFIDENCE_THRESHOLD
+
+    # Simple policy: high confidence => auto, otherwise => review
+    status = (
+        EmailStatus.auto
+        if confidence >= threshold
+        else EmailStatus.review
+    )
+
+    email_obj = EmailORM(
+        student_name=email_in.student_name,
+        uni=email_in.uni,
+        email_address=email_in.email_address,
+        subject=email_in.subject,
+        body=email_in.body,
+        confidence=confidence,
+        status=status,
+        suggested_reply=suggested_reply,
+        received_at=received_at,
+    )
+    db.add(email_obj)
+    await db.commit()
+    await db.refresh(email_obj)
+
+    # Auto-send in the background so the Gmail round-trip isn't part of the response
+    if email_obj.status == EmailStatus.auto:
+        background_tasks.add_task(send_and_mark_sent, email_obj.id)
+
+    return email_obj
+
+
+async def auto_send_email(db: AsyncSession, email_obj: EmailORM, settings: EmailSettings) -> None:
+    """Send the suggested reply for an 'auto' email if settings allow it, marking it sent."""
+    if email_obj.status != EmailStatus.auto:
+        return
+    if not settings.auto_send_enabled or not email_obj.email_address:
+        return
     try:
-        # Get user's threshold from settings
-        settings = get_or_create_settings(db)
-        threshold = settings.auto_send_threshold or CONFIDENCE_THRESHOLD
-
-        # Simple policy: high confidence => auto, otherwise => review
-        status = (
-            EmailStatus.auto
-            if confidence >= threshold
-            else EmailStatus.review
-        )
+        creds, gmail_address = await run_in_threadpool(load_gmail_credentials)
+        if creds and creds.valid:
+            await run_in_threadpool(
+                send_email_via_gmail_api,
+                creds=creds,
+                from_addr=gmail_address or settings.email_address,
+                to_addr=email_obj.email_address,
+                subject=email_obj.subject,
+                body=email_obj.suggested_reply,
+                html_alternative=reply_needs_html(email_obj.suggested_reply),
+            )
+            email_obj.status = EmailStatus.sent
+            email_obj.approved_at = datetime.utcnow()
+            db.add(email_obj)
+            await db.commit()
+            await db.refresh(email_obj)
+    except Exception as exc:
+        print(f"Failed to auto-send email to {email_obj.email_address}: {exc}")
+        # Keep status as auto if send fails, don't crash
+
+
+async def send_and_mark_sent(email_id: int) -> None:
+    """Background task: auto-send the reply for *email_id* using its own DB session."""
+    async with SessionLocal() as db:
+        email_obj = await db.get(EmailORM, email_id)
+        if email_obj is None:
+            return
+        settings = await get_settings_snapshot(db)
+        await auto_send_email(db, email_obj, settings)
 
-        email_obj = EmailORM(
-            student_name=email_in.student_name,
-            uni=email_in.uni,
-            email_address=email_in.email_address,
-            subject=email_in.subject,
-            body=email_in.body,
-            confidence=confidence,
-            status=status,
-            suggested_reply=suggested_reply,
-            received_at=received_at,
+
+@app.post("/emails/ingest_batch", response_model=List[Email])
+async def ingest_email_batch(
+    emails_in: List[EmailIn],
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Ingest several emails at once.
+
+    Same policy as /emails/ingest, but the advisor ranks every body in a single
+    TF-IDF pass and all rows are written with one multi-row INSERT.
+    """
+    if not emails_in:
+        return []
+
+    for email_in in emails_in:
+        if email_in.email_address:
+            email_in.email_address = validate_and_normalize_email(email_in.email_address)
+
+    results = await run_advisor_batch(
+        [email_in.body for email_in in emails_in],
+        [{"student_name": email_in.student_name} for email_in in emails_in],
+    )
+
+    settings = await get_settings_snapshot(db)
+    threshold = settings.auto_send_threshold or CONFIDENCE_THRESHOLD
+
+    now = datetime.utcnow()
+    rows = []
+    for email_in, result in zip(emails_in, results):
+        confidence = float(result.confidence or 0.0)
+        rows.append(
+            {
+                "student_name": email_in.student_name,
+                "uni": email_in.uni,
+                "email_address": email_in.email_address,
+                "subject": email_in.subject,
+                "body": email_in.body,
+                "confidence": confidence,
+                "status": EmailStatus.auto if confidence >= threshold else EmailStatus.review,
+                "suggested_reply": result.body,
+                "received_at": email_in.received_at or now,
+            }
         )
-        db.add(email_obj)
-        db.commit()
-        db.refresh(email_obj)
-
-        # Auto-send if status is auto and settings allow it
-        if status == EmailStatus.auto:
-            if settings.auto_send_enabled and email_in.email_address:
-                try:
-                    creds, gmail_address = load_gmail_credentials()
-                    if creds and creds.valid:
-                        send_email_via_gmail_api(
-                            creds=creds,
-                            from_addr=gmail_address or settings.email_address,
-                            to_addr=email_in.email_address,
-                            subject=email_obj.subject,
-                            body=suggested_reply,
-                        )
-                        email_obj.status = EmailStatus.sent
-                        email_obj.approved_at = datetime.utcnow()
-                        db.add(email_obj)
-                        db.commit()
-                        db.refresh(email_obj)
-                except Exception as exc:
-                    print(f"Failed to auto-send email to {email_in.email_address}: {exc}")
-                    # Keep status as auto if send fails, don't crash
 
-        return orm_to_schema(email_obj)
-    finally:
-        db.close()
+    email_objs = list((await db.scalars(insert(EmailORM).returning(EmailORM, sort_by_parameter_order=True), rows)).all())
+    await db.commit()
+
+    for email_obj in email_objs:
+        if email_obj.status == EmailStatus.auto:
+            background_tasks.add_task(send_and_mark_sent, email_obj.id)
+
+    return email_objs
 
 
 # =====================================================
@@ -1210,175 +1736,259 @@ def ingest_email(email_in: EmailIn):
 # =====================================================
 
 
+async def fetch_sync_candidates(
+    db: AsyncSession, creds: Credentials, msg_ids: List[str], seen: set
+) -> Tuple[List[Tuple[str, str, str, Optional[str], str]], List[str]]:
+    """
+    Fetch one batch of Gmail messages and return the ones worth storing as
+    (msg_id, subject, from_name, from_addr, body) plus the ids to skip.
+    """
+    pending: List[Tuple[str, str, str, Optional[str], str]] = []
+
+    # Messages already stored (e.g. marked unread again after a sync) are skipped
+    # straight from the list result, before any of their content is downloaded
+    known_ids = set(
+        await db.scalars(
+            select(EmailORM.gmail_message_id).where(EmailORM.gmail_message_id.in_(msg_ids))
+        )
+    )
+    skipped_ids: List[str] = [msg_id for msg_id in msg_ids if msg_id in known_ids]
+    msg_ids = [msg_id for msg_id in msg_ids if msg_id not in known_ids]
+    if not msg_ids:
+        return pending, skipped_ids
+
+    # Gmail returns the MIME tree already parsed; only the text/plain part is decoded here
+    fetched = await gmail_get_messages(creds, msg_ids, format="full")
+
+    bodies: Dict[str, str] = {}
+    needs_raw = []
+    for msg_id, msg_data in fetched.items():
+        text = extract_text_from_payload(msg_data["payload"])
+        if text is None:
+            needs_raw.append(msg_id)
+        else:
+            bodies[msg_id] = text
+    if needs_raw:
+        # Fallback: parse the raw RFC 822 message when the body wasn't inlined
+        raw_messages = await gmail_get_messages(creds, needs_raw, format="raw")
+        for msg_id, msg_data in raw_messages.items():
+            raw_bytes = base64.urlsafe_b64decode(msg_data["raw"].encode("utf-8"))
+            msg = email.message_from_bytes(raw_bytes, policy=policy.default)
+            bodies[msg_id] = extract_text_from_email(msg)
+
+    for msg_id in msg_ids:
+        if msg_id not in bodies:
+            continue
+
+        headers = gmail_headers(fetched[msg_id]["payload"])
+        subject = decode_mime_header(headers.get("subject", ""))
+
+        from_name, from_addr = parse_sender(headers.get("from", ""))
+
+        # Validate sender email if present
+        if from_addr:
+            try:
+                from_addr = validate_and_normalize_email(from_addr)
+            except HTTPException:
+                # Skip invalid sender emails
+                skipped_ids.append(msg_id)
+                continue
+
+        body = bodies[msg_id]
+        if not body.strip():
+            # Mark as read but skip storing empty messages
+            skipped_ids.append(msg_id)
+            continue
+
+        pending.append((msg_id, subject, from_name, from_addr, body))
+
+    # Duplicate content check on the indexed content hash: one query per batch
+    hashes = [
+        email_content_hash(subject or "(no subject)", body)
+        for _, subject, _, _, body in pending
+    ]
+    if pending:
+        seen.update(
+            await db.scalars(
+                select(EmailORM.content_hash).where(EmailORM.content_hash.in_(hashes))
+            )
+        )
+
+    unique_pending = []
+    for item, content_hash in zip(pending, hashes):
+        if content_hash in seen:
+            # Duplicate (already stored, or earlier in this sync): still mark as read
+            skipped_ids.append(item[0])
+            continue
+        seen.add(content_hash)
+        unique_pending.append(item)
+    return unique_pending, skipped_ids
+
+
 @app.post("/emails/sync")
-def sync_emails(limit: int = 20):
+async def sync_emails(limit: int = 20, db: AsyncSession = Depends(get_db)):
     """
     Use Gmail API (OAuth) to pull unread emails, run them through the advisor,
     store them in SQLite, and optionally auto-send replies.
     """
-    db = SessionLocal()
-    try:
-        settings = get_or_create_settings(db)
-        creds, gmail_address = load_gmail_credentials()
-        if not creds or not creds.valid:
-            raise HTTPException(
-                status_code=400,
-                detail="Gmail is not connected. Use /gmail/auth-url via the Settings tab.",
-            )
+    settings = await get_or_create_settings(db)
+    creds, gmail_address = await run_in_threadpool(load_gmail_credentials)
+    if not creds or not creds.valid:
+        raise HTTPException(
+            status_code=400,
+            detail="Gmail is not connected. Use /gmail/auth-url via the Settings tab.",
+        )
 
-        service = build("gmail", "v1", credentials=creds)
+    service = gmail_service(creds)
 
-        # Pull unread messages
-        res = (
-            service.users()
-            .messages()
-            .list(userId="me", q="is:unread", maxResults=limit)
-            .execute()
+    # Pull unread messages
+    res = await gmail_execute(
+        service.users()
+        .messages()
+        .list(userId="me", q="is:unread", maxResults=limit)
+    )
+    messages = res.get("messages", [])
+
+    # Settings don't change during a sync: read them once
+    threshold = settings.auto_send_threshold or CONFIDENCE_THRESHOLD
+    auto_send_enabled = settings.auto_send_enabled
+    reply_from = gmail_address or settings.email_address
+
+    # (msg_id, subject, from_name, from_addr, body) for messages worth storing
+    pending: List[Tuple[str, str, str, Optional[str], str]] = []
+    # Skipped messages (invalid sender, empty, duplicate) are still marked as read
+    skipped_ids: List[str] = []
+    # Content hashes already stored or seen earlier in this sync
+    seen: set = set()
+
+    # Pipeline per Gmail batch: while the advisor scores one chunk in
+    # ADVISOR_POOL, the next chunk is being fetched from Gmail.
+    scoring = []
+    msg_ids = [m["id"] for m in messages]
+    for start in range(0, len(msg_ids), GMAIL_BATCH_LIMIT):
+        chunk, chunk_skipped = await fetch_sync_candidates(
+            db, creds, msg_ids[start : start + GMAIL_BATCH_LIMIT], seen
         )
-        messages = res.get("messages", [])
-
-        ingested = 0
-        auto_sent = 0
-        threshold = settings.auto_send_threshold or CONFIDENCE_THRESHOLD
-
-        for m in messages:
-            msg_id = m["id"]
-            msg_data = (
-                service.users()
-                .messages()
-                .get(userId="me", id=msg_id, format="raw")
-                .execute()
+        skipped_ids.extend(chunk_skipped)
+        if chunk:
+            scoring.append(
+                (
+                    chunk,
+                    asyncio.ensure_future(
+                        run_advisor_batch(
+                            [body for _, _, _, _, body in chunk],
+                            [{"student_name": from_name} for _, _, from_name, _, _ in chunk],
+                        )
+                    ),
+                )
             )
 
-            raw_b64 = msg_data["raw"]
-            raw_bytes = base64.urlsafe_b64decode(raw_b64.encode("utf-8"))
-            msg = email.message_from_bytes(raw_bytes)
-
-            raw_subject = msg.get("Subject", "")
-            decoded = decode_header(raw_subject)[0]
-            subject, enc = decoded
-            if isinstance(subject, bytes):
-                subject = subject.decode(enc or "utf-8", errors="ignore")
-
-            from_name, from_addr = parseaddr(msg.get("From", ""))
-
-            # Validate sender email if present
-            if from_addr:
-                try:
-                    from_addr = validate_and_normalize_email(from_addr)
-                except HTTPException:
-                    # Skip invalid sender emails
-                    service.users().messages().modify(
-                        userId="me",
-                        id=msg_id,
-                        body={"removeLabelIds": ["UNREAD"]},
-                    ).execute()
-                    continue
-
-            body = extract_text_from_email(msg)
-            if not body.strip():
-                # Mark as read but skip storing empty messages
-                service.users().messages().modify(
-                    userId="me",
-                    id=msg_id,
-                    body={"removeLabelIds": ["UNREAD"]},
-                ).execute()
-                continue
-
-            # Naive duplicate check (subject + body)
-            existing = (
-                db.query(EmailORM)
-                .filter(EmailORM.subject == subject, EmailORM.body == body)
-                .first()
-            )
-            if existing:
-                # Still mark as read
-                service.users().messages().modify(
-                    userId="me",
-                    id=msg_id,
-                    body={"removeLabelIds": ["UNREAD"]},
-                ).execute()
-                continue
+    results = []
+    for chunk, task in scoring:
+        pending.extend(chunk)
+        results.extend(await task)
 
-            result = advisor.process_query(
-                body,
-                {"student_name": from_name},
-            )
-            confidence = float(result.confidence or 0.0)
-            suggested_reply = result.body
+    rows = []
+    now = datetime.utcnow()
+    for (msg_id, subject, from_name, from_addr, body), result in zip(pending, results):
+        confidence = float(result.confidence or 0.0)
+
+        # Extract UNI from email address (format: UNI@columbia.edu)
+        extracted_uni = None
+        if from_addr:
+            from_addr_lower = from_addr.lower()
+            if from_addr_lower.endswith("@columbia.edu"):
+                extracted_uni = from_addr_lower.replace("@columbia.edu", "")
+            elif from_addr_lower.endswith("@barnard.edu"):
+                extracted_uni = from_addr_lower.replace("@barnard.edu", "")
+
+        rows.append(
+            {
+                "student_name": from_name or None,
+                "uni": extracted_uni,
+                "email_address": from_addr,  # Store sender's email for replies!
+                "subject": subject or "(no subject)",
+                "body": body,
+                "confidence": confidence,
+                "status": EmailStatus.auto if confidence >= threshold else EmailStatus.review,
+                "suggested_reply": result.body,
+                "received_at": now,
+                "gmail_message_id": msg_id,
+            }
+        )
 
-            status_enum = (
-                EmailStatus.auto if confidence >= threshold else EmailStatus.review
-            )
+    # One multi-row INSERT and one transaction for the whole sync
+    email_objs: List[EmailORM] = []
+    if rows:
+        email_objs = list(
+            (
+                await db.scalars(
+                    insert(EmailORM).returning(EmailORM, sort_by_parameter_order=True),
+                    rows,
+                )
+            ).all()
+        )
+        await db.commit()
+    ingested = len(email_objs)
+    # Optional auto-send via Gmail API; a few sends in flight at once (each on its worker
+    # thread's client, throttled by the shared quota bucket)
+    send_slots = asyncio.Semaphore(GMAIL_MAX_CONCURRENT_SENDS)
+
+    async def send_reply(email_obj: EmailORM, subject: str, to_addr: str) -> Optional[int]:
+        async with send_slots:
+            try:
+                await run_in_threadpool(
+                    send_email_via_gmail_api,
+                    creds=creds,
+                    from_addr=reply_from,
+                    to_addr=to_addr,
+                    subject=subject,
+                    body=email_obj.suggested_reply,
+                    html_alternative=reply_needs_html(email_obj.suggested_reply),
+                )
+            except Exception as exc:
+                print("Failed to auto-send reply:", exc)
+                return None
+            return email_obj.id
+
+    sent = await asyncio.gather(
+        *(
+            send_reply(email_obj, subject, from_addr)
+            for (_, subject, _, from_addr, _), email_obj in zip(pending, email_objs)
+            if email_obj.status == EmailStatus.auto
+            and auto_send_enabled
+            and from_addr
+        )
+    )
+    sent_ids = [email_id for email_id in sent if email_id is not None]
+
+    # One UPDATE for every reply sent, committed together with last_synced_at below
+    if sent_ids:
+        await db.execute(
+            update(EmailORM)
+            .where(EmailORM.id.in_(sent_ids))
+            .values(status=EmailStatus.sent)
+            .execution_options(synchronize_session=False)
+        )
+    auto_sent = len(sent_ids)
 
-            # Extract UNI from email address (format: UNI@columbia.edu)
-            extracted_uni = None
-            if from_addr:
-                from_addr_lower = from_addr.lower()
-                if from_addr_lower.endswith("@columbia.edu"):
-                    extracted_uni = from_addr_lower.replace("@columbia.edu", "")
-                elif from_addr_lower.endswith("@barnard.edu"):
-                    extracted_uni = from_addr_lower.replace("@barnard.edu", "")
-
-            email_obj = EmailORM(
-                student_name=from_name or None,
-                uni=extracted_uni,
-                email_address=from_addr,  # Store sender's email for replies!
-                subject=subject or "(no subject)",
-                body=body,
-                confidence=confidence,
-                status=status_enum,
-                suggested_reply=suggested_reply,
-                received_at=datetime.utcnow(),
-            )
-            db.add(email_obj)
-            db.commit()
-            db.refresh(email_obj)
-            ingested += 1
-
-            # Optional auto-send via Gmail API
-            if (
-                status_enum == EmailStatus.auto
-                and settings.auto_send_enabled
-                and from_addr
-            ):
-                try:
-                    send_email_via_gmail_api(
-                        creds=creds,
-                        from_addr=gmail_address or settings.email_address,
-                        to_addr=from_addr,
-                        subject=subject,
-                        body=suggested_reply,
-                    )
-                    email_obj.status = EmailStatus.sent
-                    db.add(email_obj)
-                    db.commit()
-                    auto_sent += 1
-                except Exception as exc:
-                    print("Failed to auto-send reply:", exc)
-
-            # Mark the original message as read
-            service.users().messages().modify(
-                userId="me",
-                id=msg_id,
-                body={"removeLabelIds": ["UNREAD"]},
-            ).execute()
+    # Mark the original messages as read in one request
+    await gmail_mark_read(service, skipped_ids + [msg_id for msg_id, *_ in pending])
 
-        et_tz = dt_timezone(timedelta(hours=-5))
-        settings.last_synced_at = datetime.now(et_tz).replace(tzinfo=None)
+    et_tz = dt_timezone(timedelta(hours=-5))
+    settings.last_synced_at = datetime.now(et_tz).replace(tzinfo=None)
 
-        db.add(settings)
-        db.commit()
+    db.add(settings)
+    await db.commit()
+    invalidate_settings_cache()
 
-        return {
-            "ingested": ingested,
-            "auto_sent": auto_sent,
-            "last_synced_at": settings.last_synced_at.isoformat()
-            if settings.last_synced_at
-            else None,
-        }
-    finally:
-        db.close()
+    return {
+        "ingested": ingested,
+        "auto_sent": auto_sent,
+        "last_synced_at": settings.last_synced_at.isoformat()
+        if settings.last_synced_at
+        else None,
+    }
 
 
 # =====================================================
@@ -1387,12 +1997,15 @@ def sync_emails(limit: int = 20):
 
 
 @app.get("/gmail/fetch")
-def gmail_fetch(limit: int = Query(default=20, description="Max emails to fetch")):
+async def gmail_fetch(
+    limit: int = Query(default=20, description="Max emails to fetch"),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Fetch new emails from Gmail. GET endpoint for easy triggering.
     This is an alias for POST /emails/sync for convenience.
     """
-    return sync_emails(limit=limit)
+    return await sync_emails(limit=limit, db=db)
 
 
 # =====================================================
@@ -1401,79 +2014,81 @@ def gmail_fetch(limit: int = Query(default=20, description="Max emails to fetch"
 
 
 @app.post("/emails/{email_id}/send")
-def send_email_reply(email_id: int, payload: Optional[SendEmailRequest] = None):
+async def send_email_reply(
+    email_id: int,
+    payload: Optional[SendEmailRequest] = None,
+    db: AsyncSession = Depends(get_db),
+):
     """
     Send a reply email via Gmail API for the given email.
     Optionally override the reply text.
     Updates status to 'sent' after successful send.
     """
-    db = SessionLocal()
-    try:
-        email_obj = db.query(EmailORM).filter(EmailORM.id == email_id).first()
-        if email_obj is None:
-            raise HTTPException(status_code=404, detail="Email not found")
+    email_obj = await db.get(EmailORM, email_id)
+    if email_obj is None:
+        raise HTTPException(status_code=404, detail="Email not found")
 
-        # Get Gmail credentials
-        creds, gmail_address = load_gmail_credentials()
-        if not creds or not creds.valid:
+    # Get Gmail credentials
+    creds, gmail_address = await run_in_threadpool(load_gmail_credentials)
+    if not creds or not creds.valid:
+        raise HTTPException(
+            status_code=400,
+            detail="Gmail is not connected. Please connect Gmail in Settings.",
+        )
+
+    # Determine recipient
+    to_addr = email_obj.email_address
+    if not to_addr:
+        # Try to construct from UNI if available
+        if email_obj.uni:
+            to_addr = f"{email_obj.uni}@columbia.edu"
+        else:
             raise HTTPException(
                 status_code=400,
-                detail="Gmail is not connected. Please connect Gmail in Settings.",
+                detail="No recipient email address available for this email.",
             )
 
-        # Determine recipient
-        to_addr = email_obj.email_address
-        if not to_addr:
-            # Try to construct from UNI if available
-            if email_obj.uni:
-                to_addr = f"{email_obj.uni}@columbia.edu"
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail="No recipient email address available for this email.",
-                )
-
-        # Validate recipient email address
-        to_addr = validate_and_normalize_email(to_addr)
+    # Validate recipient email address
+    to_addr = validate_and_normalize_email(to_addr)
 
-        # Use provided reply text or the stored suggested_reply
-        new_reply = payload.reply_text if payload else None
-        final_reply = new_reply if new_reply is not None else email_obj.suggested_reply
+    # Use provided reply text or the stored suggested_reply
+    new_reply = payload.reply_text if payload else None
+    final_reply = new_reply if new_reply is not None else email_obj.suggested_reply
 
-        # Update the suggested_reply if a new one was provided
-        if new_reply is not None:
-            email_obj.suggested_reply = new_reply
+    # Update the suggested_reply if a new one was provided
+    if new_reply is not None:
+        email_obj.suggested_reply = new_reply
 
-        # Send the email
-        try:
-            send_email_via_gmail_api(
-                creds=creds,
-                from_addr=gmail_address,
-                to_addr=to_addr,
-                subject=email_obj.subject,
-                body=final_reply,
-            )
-        except Exception as exc:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to send email: {str(exc)}",
-            )
+    # Send the email
+    try:
+        await run_in_threadpool(
+            send_email_via_gmail_api,
+            creds=creds,
+            from_addr=gmail_address,
+            to_addr=to_addr,
+            subject=email_obj.subject,
+            body=final_reply,
+            html_alternative=reply_needs_html(final_reply),
+        )
+    except Exception as exc:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to send email: {str(exc)}",
+        )
 
-        # Update status to sent and set approved_at if not already set
-        email_obj.status = EmailStatus.sent
-        if email_obj.approved_at is None:
-            email_obj.approved_at = datetime.utcnow()
-        db.add(email_obj)
-        db.commit()
-        db.refresh(email_obj)
+    # Update status to sent and set approved_at if not already set
+    email_obj.status = EmailStatus.sent
+    if email_obj.approved_at is None:
+        email_obj.approved_at = datetime.utcnow()
+    db.add(email_obj)
+    await db.commit()
+    await db.refresh(email_obj)
 
-        return {
-            "ok": True,
-            "message": f"Reply sent to {to_addr}",
-            "email": orm_to_schema(email_obj),
-        }
-    finally:
-        db.close()
+    return {
+        "ok": True,
+        "message": f"Reply sent to {to_addr}",
+        "email": Email.model_validate(email_obj),
+    }
 
 
 # =====================================================
@@ -1482,16 +2097,17 @@ def send_email_reply(email_id: int, payload: Optional[SendEmailRequest] = None):
 
 
 @app.post("/gmail/disconnect")
-def gmail_disconnect():
+async def gmail_disconnect():
     """
     Deletes stored Gmail OAuth credentials locally.
     Does NOT revoke on Google's side (optional), but removes access for our app.
     """
     if GMAIL_TOKEN_PATH.exists():
         try:
-            GMAIL_TOKEN_PATH.unlink()
+            await run_in_threadpool(GMAIL_TOKEN_PATH.unlink)
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+    invalidate_gmail_credentials_cache()
 
     return {"ok": True}
 
@@ -1502,11 +2118,12 @@ def gmail_disconnect():
 
 
 @app.get("/emails", response_model=List[Email])
-def list_emails(
+async def list_emails(
     status: Optional[EmailStatus] = Query(
         default=None,
         description="Filter by 'auto', 'review', or 'sent'. Leave empty for all.",
-    )
+    ),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Returns a list of stored emails for the dashboard.
@@ -1515,16 +2132,81 @@ def list_emails(
     /emails?status=review → only review
     /emails?status=sent   → only sent
     """
-    db = SessionLocal()
+    emails = (await db.execute(emails_by_status_stmt(status))).scalars().all()
+    return emails
+
+
+# Columns returned by /emails/page (no body / suggested_reply)
+EMAIL_LIST_COLUMNS = (
+    EmailORM.id,
+    EmailORM.student_name,
+    EmailORM.uni,
+    EmailORM.email_address,
+    EmailORM.subject,
+    EmailORM.confidence,
+    EmailORM.status,
+    EmailORM.received_at,
+    EmailORM.approved_at,
+)
+
+
+def encode_email_cursor(received_at: datetime, email_id: int) -> str:
+    """Opaque cursor: URL-safe base64 of "received_at|id"."""
+    raw = f"{received_at.isoformat()}|{email_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_email_cursor(cursor: str) -> Tuple[datetime, int]:
     try:
-        query = db.query(EmailORM)
-        if status is not None:
-            query = query.filter(EmailORM.status == status)
-        query = query.order_by(EmailORM.received_at.desc())
-        emails = query.all()
-        return [orm_to_schema(e) for e in emails]
-    finally:
-        db.close()
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        received_at, email_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(received_at), int(email_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/emails/page", response_model=EmailPage)
+async def list_emails_page(
+    status: Optional[EmailStatus] = Query(
+        default=None,
+        description="Filter by 'auto', 'review', or 'sent'. Leave empty for all.",
+    ),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="next_cursor from the previous page.",
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Paginated version of /emails using a keyset cursor on (received_at, id).
+    Each page costs the same regardless of how many emails are stored,
+    and rows sharing a received_at (batch ingests) are neither skipped nor repeated.
+    Only list columns are selected; bodies come from GET /emails/{id}.
+    """
+    query = select(*EMAIL_LIST_COLUMNS)
+    if status is not None:
+        query = query.where(EmailORM.status == status)
+    if cursor:
+        cursor_received_at, cursor_id = decode_email_cursor(cursor)
+        query = query.where(
+            or_(
+                EmailORM.received_at < cursor_received_at,
+                and_(
+                    EmailORM.received_at == cursor_received_at,
+                    EmailORM.id < cursor_id,
+                ),
+            )
+        )
+    query = query.order_by(EmailORM.received_at.desc(), EmailORM.id.desc()).limit(limit + 1)
+    emails = (await db.execute(query)).all()
+
+    next_cursor = None
+    if len(emails) > limit:
+        emails = emails[:limit]
+        last = emails[-1]
+        next_cursor = encode_email_cursor(last.received_at, last.id)
+    return {"items": emails, "next_cursor": next_cursor}
 
 
 # =====================================================
@@ -1533,33 +2215,29 @@ def list_emails(
 
 
 @app.patch("/emails/{email_id}", response_model=Email)
-def update_email(email_id: int, update: EmailUpdate):
+async def update_email(email_id: int, update: EmailUpdate, db: AsyncSession = Depends(get_db)):
     """
     Update an email (e.g., change status from 'review' to 'auto',
     and/or edit the suggested_reply text).
     """
-    db = SessionLocal()
-    try:
-        email_obj = db.query(EmailORM).filter(EmailORM.id == email_id).first()
-        if email_obj is None:
-            raise HTTPException(status_code=404, detail="Email not found")
+    email_obj = await db.get(EmailORM, email_id)
+    if email_obj is None:
+        raise HTTPException(status_code=404, detail="Email not found")
 
-        data = update.model_dump(exclude_unset=True)
-        
-        # Set approved_at timestamp when status changes to auto or sent
-        if "status" in data:
-            new_status = data["status"]
-            if new_status in (EmailStatus.auto, EmailStatus.sent) and email_obj.approved_at is None:
-                email_obj.approved_at = datetime.utcnow()
-        
-        for field, value in data.items():
-            setattr(email_obj, field, value)
+    data = update.model_dump(exclude_unset=True)
+    
+    # Set approved_at timestamp when status changes to auto or sent
+    if "status" in data:
+        new_status = data["status"]
+        if new_status in (EmailStatus.auto, EmailStatus.sent) and email_obj.approved_at is None:
+            email_obj.approved_at = datetime.utcnow()
+    
+    for field, value in data.items():
+        setattr(email_obj, field, value)
 
-        db.commit()
-        db.refresh(email_obj)
-        return orm_to_schema(email_obj)
-    finally:
-        db.close()
+    await db.commit()
+    await db.refresh(email_obj)
+    return email_obj
 
 
 # =====================================================
@@ -1568,21 +2246,17 @@ def update_email(email_id: int, update: EmailUpdate):
 
 
 @app.delete("/emails/{email_id}")
-def delete_email(email_id: int):
+async def delete_email(email_id: int, db: AsyncSession = Depends(get_db)):
     """
     Delete an email from the database.
     """
-    db = SessionLocal()
-    try:
-        email_obj = db.query(EmailORM).filter(EmailORM.id == email_id).first()
-        if email_obj is None:
-            raise HTTPException(status_code=404, detail="Email not found")
+    email_obj = await db.get(EmailORM, email_id)
+    if email_obj is None:
+        raise HTTPException(status_code=404, detail="Email not found")
 
-        db.delete(email_obj)
-        db.commit()
-        return {"ok": True}
-    finally:
-        db.close()
+    await db.delete(email_obj)
+    await db.commit()
+    return {"ok": True}
 
 
 # =====================================================
@@ -1591,41 +2265,60 @@ def delete_email(email_id: int):
 
 
 @app.get("/emails/assignments")
-def get_all_assignments():
+async def get_all_assignments(db: AsyncSession = Depends(get_db)):
     """
     Get all email-to-advisor assignments.
     Returns: { email_id: "advisor_name", ... }
     """
-    db = SessionLocal()
-    try:
-        assignments = db.query(EmailAssignmentORM).all()
-        return {assignment.email_id: assignment.assigned_person for assignment in assignments}
-    finally:
-        db.close()
+    assignments = (await db.execute(select(EmailAssignmentORM))).scalars().all()
+    return {assignment.email_id: assignment.assigned_person for assignment in assignments}
+
+
+# =====================================================
+# Endpoint: get a single email
+# =====================================================
+
+
+@app.get("/emails/{email_id}", response_model=Email)
+async def get_email(email_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Full email (including body and suggested_reply), e.g. for rows from /emails/page.
+    """
+    email_obj = await db.get(EmailORM, email_id)
+    if email_obj is None:
+        raise HTTPException(status_code=404, detail="Email not found")
+    return email_obj
 
 
 @app.post("/emails/{email_id}/assign")
-def assign_email(email_id: int, person: str = Query(..., description="Advisor name")):
+async def assign_email(
+    email_id: int,
+    person: str = Query(..., description="Advisor name"),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Assign an email to an advisor.
 
     Example: POST /emails/42/assign?person=Kelly
     """
-    db = SessionLocal()
     try:
         # Verify email exists
-        email_obj = db.query(EmailORM).filter(EmailORM.id == email_id).first()
+        email_obj = await db.get(EmailORM, email_id)
         if email_obj is None:
             raise HTTPException(status_code=404, detail="Email not found")
 
         # Check if assignment already exists
-        existing = db.query(EmailAssignmentORM).filter(EmailAssignmentORM.email_id == email_id).first()
+        existing = (
+            await db.execute(
+                select(EmailAssignmentORM).where(EmailAssignmentORM.email_id == email_id)
+            )
+        ).scalar_one_or_none()
 
         if existing:
             # Update existing assignment
             existing.assigned_person = person
             existing.updated_at = datetime.utcnow()
-            db.commit()
+            await db.commit()
             return {"ok": True, "email_id": email_id, "assigned_person": person}
         else:
             # Create new assignment
@@ -1636,33 +2329,31 @@ def assign_email(email_id: int, person: str = Query(..., description="Advisor na
                 updated_at=datetime.utcnow()
             )
             db.add(assignment)
-            db.commit()
+            await db.commit()
             return {"ok": True, "email_id": email_id, "assigned_person": person}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
-    finally:
-        db.close()
 
 
 @app.delete("/emails/{email_id}/assign")
-def unassign_email(email_id: int):
+async def unassign_email(email_id: int, db: AsyncSession = Depends(get_db)):
     """
     Remove advisor assignment from an email.
 
     Example: DELETE /emails/42/assign
     """
-    db = SessionLocal()
-    try:
-        assignment = db.query(EmailAssignmentORM).filter(EmailAssignmentORM.email_id == email_id).first()
-        if assignment is None:
-            return {"ok": True, "message": "No assignment found"}
+    assignment = (
+        await db.execute(
+            select(EmailAssignmentORM).where(EmailAssignmentORM.email_id == email_id)
+        )
+    ).scalar_one_or_none()
+    if assignment is None:
+        return {"ok": True, "message": "No assignment found"}
 
-        db.delete(assignment)
-        db.commit()
-        return {"ok": True, "email_id": email_id, "message": "Assignment removed"}
-    finally:
-        db.close()
+    await db.delete(assignment)
+    await db.commit()
+    return {"ok": True, "email_id": email_id, "message": "Assignment removed"}
 
 
 # =====================================================
@@ -1671,7 +2362,7 @@ def unassign_email(email_id: int):
 
 
 @app.get("/respond")
-def respond(
+async def respond(
     query: str = Query(..., description="Student's email query"),
     student_name: Optional[str] = None,
 ):
@@ -1681,7 +2372,7 @@ def respond(
 
     This is like a playground / test endpoint for manually trying prompts.
     """
-    result = advisor.process_query(query, {"student_name": student_name})
+    result = await run_advisor(query, {"student_name": student_name})
     return {
         "subject": result.subject,
         "body": result.body,
@@ -1695,129 +2386,110 @@ def respond(
 from zoneinfo import ZoneInfo  # Add this import at top of file (Python 3.9+)
 # OR for older Python: from pytz import timezone
 
-@app.get("/metrics")
-def metrics():
+EASTERN_TZ = ZoneInfo("America/New_York")
+
+# (start, end) of the current Eastern calendar day in UTC; recomputed after midnight ET
+_eastern_day_bounds: Optional[Tuple[datetime, datetime]] = None
+
+
+def start_of_today_utc() -> datetime:
     """
-    Returns real dashboard statistics computed from the database.
-    Emails today is calculated based on US Eastern timezone calendar day.
+    Start of today's US Eastern calendar day, as a UTC datetime.
+    Cached until the next Eastern midnight so polled endpoints don't redo the
+    timezone math; DST transitions are handled by ZoneInfo.
     """
-    db = SessionLocal()
-    try:
-        # Total emails
-        total = db.query(func.count(EmailORM.id)).scalar() or 0
-
-        # =====================================================
-        # FIXED: Calculate "emails today" based on Eastern Time calendar day
-        # This matches what users see in the UI (ET timezone)
-        # =====================================================
-        eastern = ZoneInfo("America/New_York")
-        now_eastern = datetime.now(eastern)
-        
-        # Start of today in Eastern time
-        start_of_today_eastern = now_eastern.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Convert to UTC for database comparison (assuming received_at is stored in UTC)
-        start_of_today_utc = start_of_today_eastern.astimezone(ZoneInfo("UTC"))
-        
-        emails_today = (
-            db.query(func.count(EmailORM.id))
-            .filter(EmailORM.received_at >= start_of_today_utc)
-            .scalar()
-            or 0
-        )
+    global _eastern_day_bounds
+    now_utc = datetime.now(dt_timezone.utc)
+    bounds = _eastern_day_bounds
+    if bounds is not None and bounds[0] <= now_utc < bounds[1]:
+        return bounds[0]
 
-        # Counts by status
-        auto_count = (
-            db.query(func.count(EmailORM.id))
-            .filter(EmailORM.status == EmailStatus.auto)
-            .scalar()
-            or 0
-        )
-        review_count = (
-            db.query(func.count(EmailORM.id))
-            .filter(EmailORM.status == EmailStatus.review)
-            .scalar()
-            or 0
-        )
-        sent_count = (
-            db.query(func.count(EmailORM.id))
-            .filter(EmailORM.status == EmailStatus.sent)
-            .scalar()
-            or 0
-        )
+    today_eastern = now_utc.astimezone(EASTERN_TZ).date()
+    start = datetime.combine(today_eastern, datetime.min.time(), tzinfo=EASTERN_TZ)
+    end = datetime.combine(today_eastern + timedelta(days=1), datetime.min.time(), tzinfo=EASTERN_TZ)
+    bounds = (start.astimezone(dt_timezone.utc), end.astimezone(dt_timezone.utc))
+    _eastern_day_bounds = bounds
+    return bounds[0]
 
-        # Average confidence for ALL emails
-        avg_conf = db.query(func.avg(EmailORM.confidence)).scalar()
-        if avg_conf is None:
-            avg_conf = 0.0
 
-        # Average confidence for approved (auto) emails only
-        avg_auto_conf = (
-            db.query(func.avg(EmailORM.confidence))
-            .filter(EmailORM.status == EmailStatus.auto)
-            .scalar()
+@app.get("/metrics")
+async def metrics(db: AsyncSession = Depends(get_db)):
+    """
+    Returns real dashboard statistics computed from the database.
+    Emails today is calculated based on US Eastern timezone calendar day.
+    """
+    return await compute_metrics(db)
+
+
+async def compute_metrics(db: AsyncSession) -> Dict[str, Any]:
+    """Counters and averages shared by /metrics and /metrics-dashboard (one SQL statement)."""
+    # =====================================================
+    # FIXED: Calculate "emails today" based on Eastern Time calendar day
+    # This matches what users see in the UI (ET timezone)
+    # Compared in UTC (received_at is stored in UTC)
+    # =====================================================
+    today_start = start_of_today_utc()
+
+    # One pass over the table for every counter/average (conditional aggregation)
+    row = (
+        await db.execute(
+            select(
+                func.count(EmailORM.id),
+                func.sum(case((EmailORM.received_at >= today_start, 1), else_=0)),
+                func.sum(case((EmailORM.status == EmailStatus.auto, 1), else_=0)),
+                func.sum(case((EmailORM.status == EmailStatus.review, 1), else_=0)),
+                func.sum(case((EmailORM.status == EmailStatus.sent, 1), else_=0)),
+                # Average confidence for ALL emails
+                func.avg(EmailORM.confidence),
+                # Average confidence for approved (auto) emails only
+                func.avg(case((EmailORM.status == EmailStatus.auto, EmailORM.confidence))),
+            )
         )
-        if avg_auto_conf is None:
-            avg_auto_conf = 0.0
+    ).one()
+    total, emails_today, auto_count, review_count, sent_count, avg_conf, avg_auto_conf = row
 
-        return {
-            "emails_total": int(total),
-            "emails_today": int(emails_today),
-            "auto_count": int(auto_count),
-            "review_count": int(review_count),
-            "sent_count": int(sent_count),
-            "avg_confidence": float(avg_conf),
-            "avg_auto_confidence": float(avg_auto_conf),
-        }
-    finally:
-        db.close()
+    return {
+        "emails_total": int(total or 0),
+        "emails_today": int(emails_today or 0),
+        "auto_count": int(auto_count or 0),
+        "review_count": int(review_count or 0),
+        "sent_count": int(sent_count or 0),
+        "avg_confidence": float(avg_conf or 0.0),
+        "avg_auto_confidence": float(avg_auto_conf or 0.0),
+    }
 
 
 @app.get("/metrics-dashboard")
-def metrics_dashboard():
+async def metrics_dashboard(db: AsyncSession = Depends(get_db)):
     """
     Returns a beautiful HTML dashboard displaying system metrics.
     """
-    db = SessionLocal()
-    try:
-        # Calculate all metrics
-        total = db.query(func.count(EmailORM.id)).scalar() or 0
-
-        eastern = ZoneInfo("America/New_York")
-        now_eastern = datetime.now(eastern)
-        start_of_today_eastern = now_eastern.replace(hour=0, minute=0, second=0, microsecond=0)
-        start_of_today_utc = start_of_today_eastern.astimezone(ZoneInfo("UTC"))
-
-        emails_today = (
-            db.query(func.count(EmailORM.id))
-            .filter(EmailORM.received_at >= start_of_today_utc)
-            .scalar()
-            or 0
-        )
-
-        auto_count = db.query(func.count(EmailORM.id)).filter(EmailORM.status == EmailStatus.auto).scalar() or 0
-        review_count = db.query(func.count(EmailORM.id)).filter(EmailORM.status == EmailStatus.review).scalar() or 0
-        sent_count = db.query(func.count(EmailORM.id)).filter(EmailORM.status == EmailStatus.sent).scalar() or 0
-
-        avg_conf = db.query(func.avg(EmailORM.confidence)).scalar() or 0.0
-        avg_auto_conf = db.query(func.avg(EmailORM.confidence)).filter(EmailORM.status == EmailStatus.auto).scalar() or 0.0
-
-        # Calculate confidence percentages
-        avg_conf_pct = round(avg_conf * 100, 1)
-        avg_auto_pct = round(avg_auto_conf * 100, 1) if avg_auto_conf else 0
-
-        # Determine confidence status
-        if avg_conf < 0.55:
-            conf_status = "⚠️ Below Review Threshold"
-            conf_color = "#ef4444"
-        elif avg_conf < 0.95:
-            conf_status = "✓ Awaiting Review"
-            conf_color = "#f59e0b"
-        else:
-            conf_status = "✅ Ready for Auto-Send"
-            conf_color = "#10b981"
+    # Calculate all metrics (single aggregate query)
+    stats = await compute_metrics(db)
+    total = stats["emails_total"]
+    emails_today = stats["emails_today"]
+    auto_count = stats["auto_count"]
+    review_count = stats["review_count"]
+    sent_count = stats["sent_count"]
+    avg_conf = stats["avg_confidence"]
+    avg_auto_conf = stats["avg_auto_confidence"]
+
+    # Calculate confidence percentages
+    avg_conf_pct = round(avg_conf * 100, 1)
+    avg_auto_pct = round(avg_auto_conf * 100, 1) if avg_auto_conf else 0
+
+    # Determine confidence status
+    if avg_conf < 0.55:
+        conf_status = "⚠️ Below Review Threshold"
+        conf_color = "#ef4444"
+    elif avg_conf < 0.95:
+        conf_status = "✓ Awaiting Review"
+        conf_color = "#f59e0b"
+    else:
+        conf_status = "✅ Ready for Auto-Send"
+        conf_color = "#10b981"
 
-        html_content = f"""
+    html_content = f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -2109,6 +2781,4 @@ def metrics_dashboard():
 </body>
 </html>
 """
-        return HTMLResponse(content=html_content)
-    finally:
-        db.close()
\ No newline at end of file
+    return HTMLResponse(content=html_content)
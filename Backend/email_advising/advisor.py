@@ -2,7 +2,11 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, List, Optional, Protocol
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from string import Formatter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Protocol, Sequence
 
 from .knowledge_base import KnowledgeBase
 from .composers import EmailComposer, TemplateEmailComposer
@@ -17,29 +21,76 @@ from .similarity import TfIdfVectorizer
 from .metadata import MetadataExtractor
 from .text_processing import augment_tokens, tokenize
 
+# Lowest confidence an article can get; articles sharing no token with a query score exactly this
+_CONFIDENCE_FLOOR = 0.05
+
+_SENTENCE_SPLIT_RE = re.compile(r"[.!?]+")
+# Leading key of a format field name ("name" in "name.attr" / "name[0]")
+_FIELD_KEY_RE = re.compile(r"[^.\[]*")
+
+
+try:
+    _popcount = int.bit_count  # Python 3.10+
+except AttributeError:  # pragma: no cover - Python 3.9
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+class _UtteranceBits(NamedTuple):
+    """An utterance's raw and synonym-augmented token sets as vocabulary bitsets."""
+
+    raw_bits: int
+    raw_size: int
+    augmented_bits: int
+    augmented_size: int
+
 
 class _TemplateContext(dict):
-    """Mapping used to safely format response templates."""
+    """Mapping used to safely format response templates.
+
+    Unknown placeholders render as ``{key}``. Call :meth:`track` with the
+    template's placeholder names to fill ``missing_keys``/``used_default_keys``.
+    """
 
     def __init__(self, defaults: Dict[str, str], overrides: Optional[Dict[str, str]] = None):
         super().__init__(defaults)
-        self._defaults = dict(defaults)
+        self._defaults = defaults
         self._override_keys = set(overrides or {})
         if overrides:
             super().update(overrides)
         self.used_default_keys: set[str] = set()
         self.missing_keys: set[str] = set()
 
-    def __getitem__(self, key: str) -> str:  # type: ignore[override]
-        try:
-            value = super().__getitem__(key)
-        except KeyError:
-            self.missing_keys.add(key)
-            return f"{{{key}}}"
-        else:
-            if key in self._defaults and key not in self._override_keys:
+    def __missing__(self, key: str) -> str:
+        return f"{{{key}}}"
+
+    def track(self, fields: Iterable[str]) -> None:
+        for key in fields:
+            if key not in self:
+                self.missing_keys.add(key)
+            elif key in self._defaults and key not in self._override_keys:
                 self.used_default_keys.add(key)
-            return value
+
+
+def _template_fields(*templates: str) -> frozenset[str]:
+    """Mapping keys looked up when *templates* are formatted with ``format_map``."""
+    fields = set()
+    for template in templates:
+        for _, field_name, _, _ in Formatter().parse(template):
+            if field_name:
+                fields.add(_FIELD_KEY_RE.match(field_name).group())
+    return frozenset(fields)
+
+
+class _QueryFeatures(NamedTuple):
+    """Tokenized views of a query shared by the TF-IDF and lexical scoring passes."""
+
+    raw_query_tokens: Sequence[str]
+    query_tokens: Sequence[str]
+    sentence_tokens: List[Sequence[str]]
+    query_token_sets: List[set[str]]
+    augmented_query_sets: List[set[str]]
+    sentence_augmented: List[Sequence[str]]
 
 
 class ReferenceRetriever(Protocol):
@@ -66,6 +117,8 @@ class EmailAdvisor:
         composer: Optional[EmailComposer] = None,
         reference_limit: int = 3,
         metadata_extractor: Optional[MetadataExtractor] = None,
+        response_cache_size: int = 1024,
+        ranking_cache_size: int = 1024,
     ) -> None:
         self.knowledge_base = knowledge_base
         self.confidence_settings = confidence_settings or ConfidenceSettings()
@@ -83,13 +136,28 @@ class EmailAdvisor:
         self.reference_limit = max(reference_limit, 0)
         self.email_composer = composer or TemplateEmailComposer()
         self.metadata_extractor = metadata_extractor or MetadataExtractor()
+        # Exact-match LRU of responses keyed by (query, metadata). Set response_cache_size=0
+        # to disable, e.g. with a composer whose output should differ between calls.
+        self.response_cache_size = max(response_cache_size, 0)
+        self._response_cache: "OrderedDict[tuple, AdvisorResponse]" = OrderedDict()
+        self._response_cache_lock = threading.Lock()
+        # LRU of rankings keyed by the query's token structure, so queries differing only in
+        # case, accents or spacing (or in metadata, for the response cache) skip scoring
+        self.ranking_cache_size = max(ranking_cache_size, 0)
+        self._ranking_cache: "OrderedDict[tuple, tuple[RankedMatch, ...]]" = OrderedDict()
+        self._ranking_cache_lock = threading.Lock()
         self._known_metadata_keys: set[str] = set(self.metadata_defaults.keys())
         documents = []
-        self._article_token_sets: List[set[str]] = []
         self._category_token_sets: List[set[str]] = []
-        self._utterance_token_sets: List[List[List[str]]] = []
+        self._utterance_token_sets: List[List[Sequence[str]]] = []
         self._domain_vocabulary: set[str] = set()
-        for article in self.knowledge_base:
+        # Defaults merged with each article's own metadata, built once instead of per render
+        self._article_defaults: Dict[str, Dict[str, str]] = {}
+        # Placeholder names per article template, parsed on first render
+        self._article_fields: Dict[str, frozenset[str]] = {}
+        # Token -> bitmask of the articles whose document, utterances or categories contain it
+        self._token_articles: Dict[str, int] = {}
+        for idx, article in enumerate(self.knowledge_base):
             tokens = tokenize(
                 " ".join(
                     list(article.utterances)
@@ -99,13 +167,68 @@ class EmailAdvisor:
             )
             augmented_tokens = augment_tokens(tokens)
             documents.append(augmented_tokens)
-            self._article_token_sets.append(set(augmented_tokens))
             self._domain_vocabulary.update(augmented_tokens)
             self._utterance_token_sets.append([tokenize(utterance) for utterance in article.utterances])
             category_tokens = augment_tokens(tokenize(" ".join(article.categories)))
             self._category_token_sets.append(set(category_tokens))
+            article_tokens = set(augmented_tokens).union(category_tokens)
+            for utterance_tokens in self._utterance_token_sets[-1]:
+                article_tokens.update(augment_tokens(utterance_tokens))
+            for token in article_tokens:
+                self._token_articles[token] = self._token_articles.get(token, 0) | 1 << idx
             self._known_metadata_keys.update(article.metadata.keys())
+            self._article_defaults[article.id] = self.metadata_defaults | article.metadata
         self.vectorizer = TfIdfVectorizer(documents)
+        self._build_token_bitsets()
+
+    def _build_token_bitsets(self) -> None:
+        """Precompute utterance/category token sets as integer bitsets over one vocabulary.
+
+        Set intersections in rank_articles become ``&`` plus a popcount, and unions
+        follow from inclusion-exclusion, so nothing is rebuilt per query.
+        """
+        vocabulary: set[str] = set()
+        utterance_sets: List[List[tuple[set[str], set[str]]]] = []
+        for utterances in self._utterance_token_sets:
+            article_sets = []
+            for tokens in utterances:
+                if not tokens:
+                    continue
+                raw, augmented = set(tokens), set(augment_tokens(tokens))
+                vocabulary.update(raw)
+                vocabulary.update(augmented)
+                article_sets.append((raw, augmented))
+            utterance_sets.append(article_sets)
+        for category_tokens in self._category_token_sets:
+            vocabulary.update(category_tokens)
+        self._token_bits: Dict[str, int] = {
+            token: 1 << index for index, token in enumerate(sorted(vocabulary))
+        }
+        # All utterances in one flat list; article i owns the slice _utterance_ranges[i]
+        self._utterance_bits: List[_UtteranceBits] = []
+        self._utterance_ranges: List[tuple[int, int]] = []
+        for article_sets in utterance_sets:
+            start = len(self._utterance_bits)
+            self._utterance_bits.extend(
+                _UtteranceBits(self._bits(raw), len(raw), self._bits(augmented), len(augmented))
+                for raw, augmented in article_sets
+            )
+            self._utterance_ranges.append((start, len(self._utterance_bits)))
+        self._utterance_tuples: List[frozenset[tuple[str, ...]]] = [
+            frozenset(tuple(tokens) for tokens in utterances if tokens)
+            for utterances in self._utterance_token_sets
+        ]
+        self._category_bits: List[tuple[int, int]] = [
+            (self._bits(tokens), len(tokens)) for tokens in self._category_token_sets
+        ]
+
+    def _bits(self, tokens: Iterable[str]) -> int:
+        """Bitset of the *tokens* present in the precomputed vocabulary (others are dropped)."""
+        token_bits = self._token_bits
+        bits = 0
+        for token in tokens:
+            bits |= token_bits.get(token, 0)
+        return bits
 
     def rank_articles(self, query: str) -> List[RankedMatch]:
         """Rank knowledge base articles by relevance and confidence.
@@ -113,154 +236,300 @@ class EmailAdvisor:
         Uses Jaccard similarity on raw tokens to measure how well the query 
         matches known utterances, then applies explicit confidence thresholds.
         """
+        return self.rank_articles_many([query])[0]
+
+    def rank_articles_many(self, queries: Sequence[str]) -> List[List[RankedMatch]]:
+        """Rank articles for several queries, scoring all TF-IDF vectors in one pass."""
+        features = [self._query_features(query) for query in queries]
+        # Rankings depend on the query only through its tokens and sentence split
+        keys = [
+            (tuple(feature.raw_query_tokens), tuple(map(tuple, feature.sentence_tokens)))
+            for feature in features
+        ]
+        rankings: List[Optional[List[RankedMatch]]] = [self._ranking_cache_get(key) for key in keys]
+        misses = [index for index, ranking in enumerate(rankings) if ranking is None]
+        if misses:
+            ranked = self._rank_features([features[index] for index in misses])
+            for index, matches in zip(misses, ranked):
+                self._ranking_cache_put(keys[index], matches)
+                rankings[index] = matches
+        return rankings  # type: ignore[return-value]
+
+    def _rank_features(self, features: Sequence[_QueryFeatures]) -> List[List[RankedMatch]]:
+        # TF-IDF gives us semantic similarity using augmented tokens.
+        # Consider the full email and each sentence, taking the max similarity per article.
+        # Identical token lists (e.g. a one-sentence email and that sentence) are scored once.
+        row_ids: Dict[tuple[str, ...], int] = {}
+        feature_rows: List[List[int]] = []
+        for feature in features:
+            ids = [row_ids.setdefault(tuple(feature.query_tokens), len(row_ids))]
+            for tokens in feature.sentence_augmented:
+                ids.append(row_ids.setdefault(tuple(tokens), len(row_ids)))
+            feature_rows.append(ids)
+        rows = self.vectorizer.similarities_many(list(row_ids))
+        rankings: List[List[RankedMatch]] = []
+        for feature, ids in zip(features, feature_rows):
+            scores = rows[ids[0]]
+            for row_id in ids[1:]:
+                scores = list(map(max, scores, rows[row_id]))
+            rankings.append(self._score_articles(feature, scores))
+        return rankings
+
+    def _query_features(self, query: str) -> _QueryFeatures:
         raw_query_tokens = tokenize(query)
         query_tokens = augment_tokens(raw_query_tokens)
         sentence_tokens = [
             tokenize(segment)
-            for segment in re.split(r"[.!?]+", query)
+            for segment in _SENTENCE_SPLIT_RE.split(query)
             if segment.strip()
         ]
         if not sentence_tokens:
             sentence_tokens = [raw_query_tokens]
+        # Each sentence is augmented once; the tokens feed TF-IDF, the sets feed Jaccard
         query_token_sets: List[set[str]] = []
         augmented_query_sets: List[set[str]] = []
+        sentence_augmented: List[Sequence[str]] = []
         for tokens in sentence_tokens:
             if not tokens:
                 continue
-            qset = set(tokens)
-            if not qset:
-                continue
-            query_token_sets.append(qset)
-            augmented_query_sets.append(set(augment_tokens(tokens)))
+            augmented = augment_tokens(tokens)
+            sentence_augmented.append(augmented)
+            query_token_sets.append(set(tokens))
+            augmented_query_sets.append(set(augmented))
         if not query_token_sets:
-            base_set = set(raw_query_tokens)
-            query_token_sets = [base_set]
-            augmented_query_sets = [set(augment_tokens(raw_query_tokens))]
-        
-        # TF-IDF gives us semantic similarity using augmented tokens.
-        # Consider the full email and each sentence, taking the max similarity per article.
-        scores = self.vectorizer.similarities(query_tokens)
-        sentence_augmented = [augment_tokens(tokens) for tokens in sentence_tokens if tokens]
-        for tokens in sentence_augmented:
-            sent_scores = self.vectorizer.similarities(tokens)
-            scores = [max(base, sent) for base, sent in zip(scores, sent_scores)]
+            query_token_sets = [set(raw_query_tokens)]
+            augmented_query_sets = [set(query_tokens)]
+        return _QueryFeatures(
+            raw_query_tokens,
+            query_tokens,
+            sentence_tokens,
+            query_token_sets,
+            augmented_query_sets,
+            sentence_augmented,
+        )
+
+    def _score_articles(self, features: _QueryFeatures, scores: List[float]) -> List[RankedMatch]:
+        raw_query_tokens = features.raw_query_tokens
+        sentence_keys = {tuple(tokens) for tokens in features.sentence_tokens if tokens}
+        # Each query sentence as (bits, true set size); tokens outside the utterance
+        # vocabulary never intersect but still count towards the union via the size.
+        query_bits = [
+            (self._bits(qset), len(qset), self._bits(aug_qset), len(aug_qset))
+            for qset, aug_qset in zip(features.query_token_sets, features.augmented_query_sets)
+        ]
+
+        # PHASE 1 #1: Apply length normalization boost
+        # Short, clear queries (< 5 tokens) are more reliable → 10% boost
+        # Long, verbose queries (> 20 tokens) are harder to match → 5% penalty
+        length_boost = 1.0
+        if len(raw_query_tokens) < 5:
+            length_boost = 1.1
+        elif len(raw_query_tokens) > 20:
+            length_boost = 0.95
+
+        # Articles sharing no token with the query have zero TF-IDF, Jaccard and coverage
+        # scores, so they get the confidence floor without running the blend below
+        candidates = 0
+        token_articles = self._token_articles
+        for token in features.query_tokens:
+            candidates |= token_articles.get(token, 0)
+        for aug_qset in features.augmented_query_sets:
+            for token in aug_qset:
+                candidates |= token_articles.get(token, 0)
+
+        articles = self.knowledge_base.articles
+        confidences: List[float] = []
+
+        # Per-article structures are walked in lockstep and the popcount is bound
+        # locally, keeping attribute and global lookups out of the pair loop below
+        popcount = _popcount
+        utterance_bits = self._utterance_bits
+        per_article = zip(scores, self._utterance_tuples, self._utterance_ranges, self._category_bits)
+        for idx, (tfidf_score, utterance_tuples, (start, stop), category) in enumerate(per_article):
+            if not candidates >> idx & 1:
+                confidences.append(_CONFIDENCE_FLOOR)
+                continue
 
-        ranked: List[RankedMatch] = []
-        
-        for idx, (article, tfidf_score) in enumerate(zip(self.knowledge_base.articles, scores)):
-            utterance_token_lists = self._utterance_token_sets[idx]
-            utterance_augmented_sets = [
-                set(augment_tokens(ut)) if ut else set() for ut in utterance_token_lists
-            ]
-            
             # Check for exact token match (user query exactly matches an utterance)
-            exact_match = any(
-                ut == sentence
-                for ut in utterance_token_lists
-                for sentence in sentence_tokens
-                if ut and sentence
-            )
-            
+            if not sentence_keys.isdisjoint(utterance_tuples):
+                # Confidence is 1.0 whatever the overlaps below would be
+                confidences.append(1.0)
+                continue
+
             # Calculate best Jaccard similarity with any utterance using RAW tokens only
             # This measures phrase/pattern matching without semantic augmentation
             # PHASE 1 IMPROVEMENT #1: Length-normalized Jaccard for fair comparison
             best_utterance_similarity = 0.0
             best_query_coverage = 0.0
             best_utterance_coverage = 0.0
-            for qset, aug_qset in zip(query_token_sets, augmented_query_sets):
-                for utterance_tokens, utter_aug in zip(utterance_token_lists, utterance_augmented_sets):
-                    if not utterance_tokens:
-                        continue
-                    utterance_set = set(utterance_tokens)
-                    union_raw = len(qset | utterance_set)
-                    if union_raw:
-                        intersection_raw = len(qset & utterance_set)
-                        jaccard_raw = intersection_raw / union_raw
-
-                        # PHASE 1 #1: Apply length normalization boost
-                        # Short, clear queries (< 5 tokens) are more reliable → 10% boost
-                        # Long, verbose queries (> 20 tokens) are harder to match → 5% penalty
-                        length_boost = 1.0
-                        if len(raw_query_tokens) < 5:
-                            length_boost = 1.1
-                        elif len(raw_query_tokens) > 20:
-                            length_boost = 0.95
-                        jaccard_raw_normalized = min(jaccard_raw * length_boost, 1.0)
-
-                        best_utterance_similarity = max(best_utterance_similarity, jaccard_raw_normalized)
-                        if len(qset) > 0:
-                            query_cov = intersection_raw / len(qset)
-                            best_query_coverage = max(best_query_coverage, query_cov)
-                        if len(utterance_set) > 0:
-                            utt_cov = intersection_raw / len(utterance_set)
-                            best_utterance_coverage = max(best_utterance_coverage, utt_cov)
-                    if aug_qset and utter_aug:
-                        union_aug = len(aug_qset | utter_aug)
-                        if union_aug:
-                            intersection_aug = len(aug_qset & utter_aug)
-                            jaccard_aug = intersection_aug / union_aug
-                            best_utterance_similarity = max(best_utterance_similarity, jaccard_aug)
-                            if len(qset) > 0:
-                                query_cov = min(intersection_aug, len(qset)) / len(qset)
-                                best_query_coverage = max(best_query_coverage, query_cov)
-                            if len(utterance_set) > 0:
-                                utt_cov = min(intersection_aug, len(utterance_set)) / len(utterance_set)
-                                best_utterance_coverage = max(best_utterance_coverage, utt_cov)
-            
+            for q_bits, q_size, aug_q_bits, aug_q_size in query_bits:
+                for u_bits, u_size, aug_u_bits, aug_u_size in utterance_bits[start:stop]:
+                    # Running maxima as plain comparisons (same result as max(), no call)
+                    intersection_raw = popcount(q_bits & u_bits)
+                    union_raw = q_size + u_size - intersection_raw
+                    jaccard_raw = intersection_raw / union_raw
+                    jaccard_raw_normalized = jaccard_raw * length_boost
+                    if jaccard_raw_normalized > 1.0:
+                        jaccard_raw_normalized = 1.0
+
+                    if jaccard_raw_normalized > best_utterance_similarity:
+                        best_utterance_similarity = jaccard_raw_normalized
+                    if q_size > 0:
+                        query_cov = intersection_raw / q_size
+                        if query_cov > best_query_coverage:
+                            best_query_coverage = query_cov
+                    utt_cov = intersection_raw / u_size
+                    if utt_cov > best_utterance_coverage:
+                        best_utterance_coverage = utt_cov
+                    if aug_q_size:
+                        intersection_aug = popcount(aug_q_bits & aug_u_bits)
+                        jaccard_aug = intersection_aug / (aug_q_size + aug_u_size - intersection_aug)
+                        if jaccard_aug > best_utterance_similarity:
+                            best_utterance_similarity = jaccard_aug
+                        if q_size > 0:
+                            query_cov = min(intersection_aug, q_size) / q_size
+                            if query_cov > best_query_coverage:
+                                best_query_coverage = query_cov
+                        utt_cov = min(intersection_aug, u_size) / u_size
+                        if utt_cov > best_utterance_coverage:
+                            best_utterance_coverage = utt_cov
+                    if best_utterance_similarity == best_query_coverage == best_utterance_coverage == 1.0:
+                        break  # every maximum is saturated; no other pair can change them
+                else:
+                    continue
+                break
+
             # Compute additional overlaps for nuanced scoring
-            article_tokens = self._article_token_sets[idx]
-            category_tokens = self._category_token_sets[idx]
-            article_overlap = 0.0
+            category_bits, category_size = category
             category_overlap = 0.0
 
             # PHASE 1 IMPROVEMENT #3: Continuous category scoring
             # Replace binary category match with Jaccard similarity for smooth scoring
-            for aug_qset in augmented_query_sets:
-                if not aug_qset:
-                    continue
-                article_union = len(aug_qset | article_tokens)
-                if article_union:
-                    article_overlap = max(article_overlap, len(aug_qset & article_tokens) / article_union)
-
-                # Calculate continuous category similarity instead of binary overlap
-                if category_tokens:
-                    category_intersection = len(aug_qset & category_tokens)
-                    category_union = len(aug_qset | category_tokens)
-                    if category_union > 0:
-                        continuous_category_score = category_intersection / category_union
-                        category_overlap = max(category_overlap, continuous_category_score)
+            if category_size:
+                for _, _, aug_q_bits, aug_q_size in query_bits:
+                    if not aug_q_size:
+                        continue
+                    # Calculate continuous category similarity instead of binary overlap
+                    category_intersection = popcount(aug_q_bits & category_bits)
+                    category_union = aug_q_size + category_size - category_intersection
+                    continuous_category_score = category_intersection / category_union
+                    category_overlap = max(category_overlap, continuous_category_score)
 
             # Blend semantic (TF-IDF) and lexical overlaps. Prioritize the strongest signals
-            if exact_match:
-                confidence = 1.0
-            else:
-                coverage_signal = (best_query_coverage + best_utterance_coverage) / 2
-                base_confidence = (
-                    0.5 * best_utterance_similarity
-                    + 0.2 * coverage_signal
-                    + 0.2 * tfidf_score
-                    + 0.1 * category_overlap
-                )
-                if coverage_signal < 0.15 and best_utterance_similarity < 0.2:
-                    base_confidence *= 0.6
-                confidence = min(max(base_confidence, 0.05), 0.97)
-                if best_utterance_similarity >= 0.85:
-                    confidence = max(confidence, 0.92)
-                elif best_utterance_similarity >= 0.7:
-                    confidence = max(confidence, 0.85)
-                elif best_utterance_similarity >= 0.55 and coverage_signal >= 0.35:
-                    confidence = max(confidence, 0.78)
-                if coverage_signal >= 0.55 and category_overlap >= 0.1 and best_utterance_similarity >= 0.5:
-                    confidence = max(confidence, 0.85)
+            coverage_signal = (best_query_coverage + best_utterance_coverage) / 2
+            base_confidence = (
+                0.5 * best_utterance_similarity
+                + 0.2 * coverage_signal
+                + 0.2 * tfidf_score
+                + 0.1 * category_overlap
+            )
+            if coverage_signal < 0.15 and best_utterance_similarity < 0.2:
+                base_confidence *= 0.6
+            confidence = min(max(base_confidence, _CONFIDENCE_FLOOR), 0.97)
+            if best_utterance_similarity >= 0.85:
+                confidence = max(confidence, 0.92)
+            elif best_utterance_similarity >= 0.7:
+                confidence = max(confidence, 0.85)
+            elif best_utterance_similarity >= 0.55 and coverage_signal >= 0.35:
+                confidence = max(confidence, 0.78)
+            if coverage_signal >= 0.55 and category_overlap >= 0.1 and best_utterance_similarity >= 0.5:
+                confidence = max(confidence, 0.85)
             
-            ranked.append(
-                RankedMatch(article_id=article.id, subject=article.subject, confidence=confidence)
+            confidences.append(confidence)
+
+        # Stable descending sort of the indices (ties keep knowledge base order);
+        # matches are only built once, already in output order
+        order = sorted(range(len(confidences)), key=confidences.__getitem__, reverse=True)
+        return [
+            RankedMatch(
+                article_id=articles[idx].id,
+                subject=articles[idx].subject,
+                confidence=confidences[idx],
             )
-        
-        ranked.sort(key=lambda item: item.confidence, reverse=True)
-        return ranked
+            for idx in order
+        ]
 
     def process_query(self, query: str, metadata: Optional[Dict[str, str]] = None) -> AdvisorResponse:
+        key = self._cache_key(query, metadata)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        response = self._respond(query, metadata, self.rank_articles(query))
+        self._cache_put(key, response)
+        return response
+
+    def process_queries(
+        self,
+        queries: Sequence[str],
+        metadatas: Optional[Sequence[Optional[Dict[str, str]]]] = None,
+    ) -> List[AdvisorResponse]:
+        """Batch version of :meth:`process_query`; ranks every uncached query in one TF-IDF pass."""
+        if metadatas is None:
+            metadatas = [None] * len(queries)
+        elif len(metadatas) != len(queries):
+            raise ValueError("metadatas must have one entry per query")
+        keys = [self._cache_key(query, metadata) for query, metadata in zip(queries, metadatas)]
+        responses: List[Optional[AdvisorResponse]] = [self._cache_get(key) for key in keys]
+        misses = [index for index, response in enumerate(responses) if response is None]
+        rankings = self.rank_articles_many([queries[index] for index in misses])
+        for index, matches in zip(misses, rankings):
+            response = self._respond(queries[index], metadatas[index], matches)
+            self._cache_put(keys[index], response)
+            responses[index] = response
+        return responses  # type: ignore[return-value]
+
+    def _cache_key(self, query: str, metadata: Optional[Dict[str, str]]) -> Optional[tuple]:
+        if not self.response_cache_size:
+            return None
+        try:
+            return query, frozenset((metadata or {}).items())
+        except TypeError:  # unhashable metadata values
+            return None
+
+    def _cache_get(self, key: Optional[tuple]) -> Optional[AdvisorResponse]:
+        if key is None:
+            return None
+        with self._response_cache_lock:
+            response = self._response_cache.get(key)
+            if response is None:
+                return None
+            self._response_cache.move_to_end(key)
+        return _copy_response(response)
+
+    def _cache_put(self, key: Optional[tuple], response: AdvisorResponse) -> None:
+        if key is None:
+            return
+        with self._response_cache_lock:
+            self._response_cache[key] = _copy_response(response)
+            self._response_cache.move_to_end(key)
+            while len(self._response_cache) > self.response_cache_size:
+                self._response_cache.popitem(last=False)
+
+    def _ranking_cache_get(self, key: tuple) -> Optional[List[RankedMatch]]:
+        if not self.ranking_cache_size:
+            return None
+        with self._ranking_cache_lock:
+            matches = self._ranking_cache.get(key)
+            if matches is None:
+                return None
+            self._ranking_cache.move_to_end(key)
+        return list(matches)
+
+    def _ranking_cache_put(self, key: tuple, matches: List[RankedMatch]) -> None:
+        if not self.ranking_cache_size:
+            return
+        with self._ranking_cache_lock:
+            self._ranking_cache[key] = tuple(matches)
+            self._ranking_cache.move_to_end(key)
+            while len(self._ranking_cache) > self.ranking_cache_size:
+                self._ranking_cache.popitem(last=False)
+
+    def _respond(
+        self,
+        query: str,
+        metadata: Optional[Dict[str, str]],
+        matches: List[RankedMatch],
+    ) -> AdvisorResponse:
         metadata = dict(metadata or {})
         metadata_notes: List[str] = []
         extracted_metadata_facts: List[str] = []
@@ -274,8 +543,6 @@ class EmailAdvisor:
                 metadata_notes.append(fact.reason)
                 extracted_metadata_facts.append(fact.key)
 
-        matches = self.rank_articles(query)
-
         # PHASE 1 IMPROVEMENT #2: Metadata-boosted confidence
         # If metadata was successfully extracted, increase confidence of matches
         # since more specific context = higher reliability
@@ -381,9 +648,18 @@ class EmailAdvisor:
     def _render_article(
         self, article: KnowledgeArticle, metadata: Dict[str, str]
     ) -> tuple[Dict[str, str], _TemplateContext]:
-        context = _TemplateContext(self.metadata_defaults | article.metadata, metadata)
+        defaults = self._article_defaults.get(article.id)
+        if defaults is None:
+            defaults = self.metadata_defaults | article.metadata
+        context = _TemplateContext(defaults, metadata)
         subject = article.subject.format_map(context)
         body = article.response_template.format_map(context)
+        fields = self._article_fields.get(article.id)
+        if fields is None:
+            fields = _template_fields(article.subject, article.response_template)
+            if article.id in self._article_defaults:
+                self._article_fields[article.id] = fields
+        context.track(fields)
         return {"subject": subject, "body": body}, context
 
     def _fallback_response(
@@ -436,4 +712,15 @@ class EmailAdvisor:
             return []
 
 
+def _copy_response(response: AdvisorResponse) -> AdvisorResponse:
+    """Copy of *response* whose lists can be mutated without touching the cached entry."""
+    return replace(
+        response,
+        follow_up_questions=list(response.follow_up_questions),
+        reasons=list(response.reasons),
+        ranked_matches=list(response.ranked_matches),
+        references=list(response.references),
+    )
+
+
 __all__ = ["EmailAdvisor"]
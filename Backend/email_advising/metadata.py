@@ -44,6 +44,7 @@ _NAME_RE = re.compile(
     r"\b(?:my\s+name\s+is|this\s+is)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,2})\b",
     re.IGNORECASE,
 )
+_WORD_RE = re.compile(r"[a-z]+")
 _WITHDRAW_KEYWORDS = {"withdraw", "withdrawal", "drop", "dropped", "remove", "removed"}
 _REGISTRATION_KEYWORDS = {"register", "registration", "enroll", "enrollment", "add"}
 
@@ -112,7 +113,7 @@ class MetadataExtractor:
         value: str,
     ) -> Iterable[MetadataFact]:
         window = self._extract_window(lower_text, start, end)
-        tokens = set(re.findall(r"[a-z]+", window))
+        tokens = set(_WORD_RE.findall(window))
         if _WITHDRAW_KEYWORDS & tokens:
             reason = f"Identified withdrawal deadline '{value}' in message context."
             yield MetadataFact("withdrawal_deadline", value, reason)
@@ -12,6 +12,7 @@ from .text_processing import tokenize
 
 
 _DEFAULT_CORPUS_PATH = Path(__file__).resolve().parent.parent / "data" / "reference_corpus.json"
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+")
 
 
 def load_reference_corpus(path: Path | str | None = None) -> ReferenceCorpus:
@@ -121,7 +122,7 @@ class TfidfRetriever:
 def _build_snippet(content: str, query_tokens: set[str], max_length: int = 200) -> str:
     """Construct a snippet from *content* that mentions any of *query_tokens*."""
 
-    sentences = [segment.strip() for segment in re.split(r"(?<=[.!?])\s+", content) if segment.strip()]
+    sentences = [segment.strip() for segment in _SENTENCE_BREAK_RE.split(content) if segment.strip()]
     for sentence in sentences:
         sentence_tokens = set(tokenize(sentence))
         if query_tokens & sentence_tokens:
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import math
 from collections import Counter
-from typing import Dict, List, Sequence
+from typing import Dict, List, Sequence, Tuple
 
 Vector = Dict[int, float]
 
@@ -37,6 +37,7 @@ class TfIdfVectorizer:
         self.vocabulary: Dict[str, int] = {}
         self.idf: List[float] = []
         self.document_vectors: List[Vector] = []
+        self._postings: List[List[Tuple[int, float]]] = []
         self._build(documents)
 
     def _build(self, documents: Sequence[Sequence[str]]) -> None:
@@ -61,21 +62,50 @@ class TfIdfVectorizer:
                 weight = (1.0 + math.log(count)) * self.idf[idx]
                 vector[idx] = weight
             self.document_vectors.append(_normalize(vector))
+        # Inverted index (term -> [(document, weight)]) so a batch of queries only
+        # touches the documents that share at least one term with it.
+        self._postings = [[] for _ in range(vocab_size)]
+        for doc_idx, doc_vector in enumerate(self.document_vectors):
+            for idx, weight in doc_vector.items():
+                self._postings[idx].append((doc_idx, weight))
 
     def transform(self, tokens: Sequence[str]) -> Vector:
-        tf_counts = Counter(tokens)
+        vocabulary = self.vocabulary
+        idf = self.idf
+        log = math.log
         vector: Vector = {}
-        for term, count in tf_counts.items():
-            idx = self.vocabulary.get(term)
+        for term, count in Counter(tokens).items():
+            idx = vocabulary.get(term)
             if idx is None:
                 continue
-            weight = (1.0 + math.log(count)) * self.idf[idx]
-            vector[idx] = weight
+            # log(1) == 0, so single occurrences (the common case) skip the call
+            vector[idx] = (1.0 + log(count)) * idf[idx] if count > 1 else idf[idx]
         return _normalize(vector)
 
     def similarities(self, tokens: Sequence[str]) -> List[float]:
-        query_vector = self.transform(tokens)
-        return [cosine_similarity(query_vector, doc_vector) for doc_vector in self.document_vectors]
+        return self.similarities_many([tokens])[0]
+
+    def similarities_many(self, token_lists: Sequence[Sequence[str]]) -> List[List[float]]:
+        """Cosine similarities of every token list against every document.
+
+        The inverted index narrows each query to the documents sharing a term with
+        it; those are scored with :func:`cosine_similarity` itself, so every score
+        sums its terms in the same order (and to the same bits) as a full scan.
+        """
+
+        postings = self._postings
+        document_vectors = self.document_vectors
+        num_docs = len(document_vectors)
+        transform = self.transform
+        rows: List[List[float]] = []
+        for tokens in token_lists:
+            row = [0.0] * num_docs
+            query_vector = transform(tokens)
+            candidates = {doc_idx for idx in query_vector for doc_idx, _ in postings[idx]}
+            for doc_idx in candidates:
+                row[doc_idx] = cosine_similarity(query_vector, document_vectors[doc_idx])
+            rows.append(row)
+        return rows
 
 
 __all__ = ["TfIdfVectorizer", "cosine_similarity"]
@@ -2,11 +2,13 @@
 from __future__ import annotations
 
 import re
+import sys
 import unicodedata
-from typing import Iterable, List, Sequence
+from functools import lru_cache
+from typing import List, Sequence, Tuple
 
 
-_STOPWORDS = {
+_STOPWORDS = frozenset({
     "a",
     "an",
     "and",
@@ -41,7 +43,7 @@ _STOPWORDS = {
     "with",
     "you",
     "your",
-}
+})
 
 _TOKEN_SYNONYMS = {
     "appointment": {"meeting", "advising", "schedule"},
@@ -69,11 +71,16 @@ _TOKEN_SYNONYMS = {
     "withdraw": {"drop", "withdrawal"},
     "withdrawal": {"withdraw", "drop"},
 }
+# Frozen as tuples (in each set's iteration order) for cheaper iteration in _augment_tokens
+_TOKEN_SYNONYMS = {token: tuple(synonyms) for token, synonyms in _TOKEN_SYNONYMS.items()}
 
-_WORD_RE = re.compile(r"[^a-z0-9]+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
 
 
 def _strip_accents(value: str) -> str:
+    if value.isascii():
+        # Nothing to decompose (the common case)
+        return value
     normalized = unicodedata.normalize("NFKD", value)
     return "".join(ch for ch in normalized if not unicodedata.combining(ch))
 
@@ -82,45 +89,47 @@ def normalize_text(text: str) -> str:
     """Return a normalized representation of *text*."""
 
     lowered = _strip_accents(text.lower())
-    collapsed = _WORD_RE.sub(" ", lowered)
-    return re.sub(r"\s+", " ", collapsed).strip()
+    return " ".join(_WORD_RE.findall(lowered))
+
 
+@lru_cache(maxsize=8192)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Tokenize *text* into normalized word tokens.
 
-def tokenize(text: str) -> List[str]:
-    """Tokenize *text* into normalized word tokens."""
+    Memoized, so the result is an immutable tuple; use ``list(...)`` to modify it.
+    Tokens are interned, so vocabulary lookups usually compare by identity.
+    """
 
     normalized = normalize_text(text)
     if not normalized:
-        return []
-    return [token for token in normalized.split(" ") if token and token not in _STOPWORDS]
+        return ()
+    return tuple(
+        sys.intern(token) for token in normalized.split(" ") if token and token not in _STOPWORDS
+    )
 
 
-def augment_tokens(tokens: Sequence[str]) -> List[str]:
+def augment_tokens(tokens: Sequence[str]) -> Tuple[str, ...]:
     """Augment *tokens* with domain-specific synonyms and bi-grams."""
 
-    unique_tokens: List[str] = []
-    seen: set[str] = set()
-    for token in tokens:
-        if token not in seen:
-            seen.add(token)
-            unique_tokens.append(token)
+    return _augment_tokens(tuple(tokens))
+
+
+@lru_cache(maxsize=8192)
+def _augment_tokens(tokens: Tuple[str, ...]) -> Tuple[str, ...]:
+    unique_tokens: List[str] = list(dict.fromkeys(tokens))
+    seen: set[str] = set(unique_tokens)
     for token in tokens:
         synonyms = _TOKEN_SYNONYMS.get(token, ())
         for synonym in synonyms:
             if synonym not in seen:
                 seen.add(synonym)
                 unique_tokens.append(synonym)
-    for left, right in _iterate_bigrams(tokens):
-        bigram = f"{left}_{right}"
+    for left, right in zip(tokens, tokens[1:]):
+        bigram = sys.intern(f"{left}_{right}")
         if bigram not in seen:
             seen.add(bigram)
             unique_tokens.append(bigram)
-    return unique_tokens
-
-
-def _iterate_bigrams(tokens: Sequence[str]) -> Iterable[tuple[str, str]]:
-    for index in range(len(tokens) - 1):
-        yield tokens[index], tokens[index + 1]
+    return tuple(unique_tokens)
 
 
 __all__ = ["augment_tokens", "normalize_text", "tokenize"]
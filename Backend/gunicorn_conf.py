@@ -0,0 +1,21 @@
+"""
+Gunicorn settings for serving the API in production.
+
+Run from the Backend directory:
+    gunicorn api:app -c gunicorn_conf.py
+
+UvicornWorker picks uvloop + httptools automatically (both ship with
+uvicorn[standard]). Keep WEB_CONCURRENCY at 1 unless OAuth state and the
+settings cache move out of process: a Gmail OAuth callback that lands on a
+different worker than the one that issued the auth URL will be rejected.
+"""
+import os
+
+bind = os.getenv("BIND", "127.0.0.1:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+keepalive = 5
+timeout = 120  # Gmail sync can take a while for large batches
+graceful_timeout = 30
+accesslog = "-"
+errorlog = "-"
@@ -15,6 +15,7 @@ from email_advising import (
     load_knowledge_base,
     load_reference_corpus,
 )
+from email_advising.similarity import cosine_similarity
 
 
 @pytest.fixture(scope="module")
@@ -128,3 +129,54 @@ def test_ambiguous_queries_require_review(advisor: EmailAdvisor) -> None:
     assert response.auto_send is False
     assert response.article_id is None
     assert any("Multiple templates" in reason for reason in response.reasons)
+
+
+def test_batch_processing_matches_single_queries(advisor: EmailAdvisor) -> None:
+    queries = [
+        "How do I order my transcript?",
+        "I need to remove a course from my schedule.",
+        "I would like help planning a study abroad semester.",
+    ]
+    metadatas = [{"student_name": "Alex"}, None, {}]
+    batch = advisor.process_queries(queries, metadatas)
+    single = [advisor.process_query(query, metadata) for query, metadata in zip(queries, metadatas)]
+    assert [response.body for response in batch] == [response.body for response in single]
+    assert [response.confidence for response in batch] == [response.confidence for response in single]
+    assert [response.ranked_matches for response in batch] == [response.ranked_matches for response in single]
+
+
+def test_repeated_queries_return_independent_copies(advisor: EmailAdvisor) -> None:
+    first = advisor.process_query("How do I order my transcript?", {"student_name": "Alex"})
+    first.reasons.append("mutated by caller")
+    second = advisor.process_query("How do I order my transcript?", {"student_name": "Alex"})
+    assert "mutated by caller" not in second.reasons
+    assert second.body == first.body
+    other = advisor.process_query("How do I order my transcript?", {"student_name": "Jordan"})
+    assert "Jordan" in other.body
+
+
+def test_batched_similarities_match_cosine_scan(advisor: EmailAdvisor) -> None:
+    vectorizer = advisor.vectorizer
+    vocabulary = sorted(vectorizer.vocabulary)
+    token_lists = [
+        ["transcript", "order"],
+        vocabulary,  # longer than every document vector
+        vocabulary[::3] + ["notaword"],
+        [],
+    ]
+    rows = vectorizer.similarities_many(token_lists)
+    for tokens, row in zip(token_lists, rows):
+        query_vector = vectorizer.transform(tokens)
+        expected = [cosine_similarity(query_vector, doc) for doc in vectorizer.document_vectors]
+        assert row == pytest.approx(expected, rel=0, abs=1e-12)
+
+
+def test_ranking_cache_ignores_case_and_spacing(knowledge_base) -> None:
+    advisor = EmailAdvisor(knowledge_base)
+    first = advisor.rank_articles("How do I order my transcript?")
+    first.clear()
+    second = advisor.rank_articles("  how do I ORDER my transcript?")
+    assert second == EmailAdvisor(knowledge_base, ranking_cache_size=0).rank_articles(
+        "How do I order my transcript?"
+    )
+    assert len(advisor._ranking_cache) == 1
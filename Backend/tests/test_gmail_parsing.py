@@ -0,0 +1,101 @@
+import base64
+import json
+from pathlib import Path
+import sys
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from api import extract_text_from_payload, gmail_headers, is_retryable_gmail_error, parse_sender
+
+
+def _part(mime_type: str, text: str, charset: str = "utf-8") -> dict:
+    data = base64.urlsafe_b64encode(text.encode(charset)).decode().rstrip("=")
+    return {
+        "mimeType": mime_type,
+        "headers": [{"name": "Content-Type", "value": f'{mime_type}; charset="{charset}"'}],
+        "body": {"size": len(text), "data": data},
+    }
+
+
+def test_gmail_headers_lowercases_names_and_keeps_first_value() -> None:
+    payload = {
+        "headers": [
+            {"name": "Subject", "value": "Transcript"},
+            {"name": "Received", "value": "first"},
+            {"name": "RECEIVED", "value": "second"},
+        ]
+    }
+    assert gmail_headers(payload) == {"subject": "Transcript", "received": "first"}
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("Jane Doe <jd1234@columbia.edu>", ("Jane Doe", "jd1234@columbia.edu")),
+        ('"Doe, John" <jd1@columbia.edu>', ("Doe, John", "jd1@columbia.edu")),
+        ("=?utf-8?q?Doe=2C_John?= <jd1@columbia.edu>", ("Doe, John", "jd1@columbia.edu")),
+        ("=?utf-8?q?a=40b=2Ecom?= <real@x.com>", ("a@b.com", "real@x.com")),
+        ("=?utf-8?q?Caf=C3=A9?= <ba9@barnard.edu>", ("Café", "ba9@barnard.edu")),
+        ("jd1234@columbia.edu", ("", "jd1234@columbia.edu")),
+    ],
+)
+def test_parse_sender_decodes_only_the_display_name(header: str, expected: tuple) -> None:
+    assert parse_sender(header) == expected
+
+
+def test_extract_text_prefers_plain_part() -> None:
+    payload = {
+        "mimeType": "multipart/alternative",
+        "headers": [],
+        "parts": [_part("text/plain", "Résumé question", "latin-1"), _part("text/html", "<p>x</p>")],
+    }
+    assert extract_text_from_payload(payload) == "Résumé question"
+
+
+def test_extract_text_without_plain_part() -> None:
+    single = _part("text/html", "<p>hello</p>")
+    assert extract_text_from_payload(single) == "<p>hello</p>"
+    multipart = {"mimeType": "multipart/mixed", "headers": [], "parts": [_part("text/html", "<p>x</p>")]}
+    assert extract_text_from_payload(multipart) == ""
+
+
+def test_extract_text_needs_raw_when_body_not_inlined() -> None:
+    payload = {
+        "mimeType": "text/plain",
+        "headers": [],
+        "body": {"size": 10_000_000, "attachmentId": "abc"},
+    }
+    assert extract_text_from_payload(payload) is None
+
+
+def _http_error(status: int, reason: str = "") -> HttpError:
+    content = json.dumps({"error": {"errors": [{"reason": reason}]}}).encode() if reason else b""
+    return HttpError(httplib2.Response({"status": status}), content)
+
+
+@pytest.mark.parametrize(
+    "status, reason, retryable",
+    [
+        (429, "", True),
+        (500, "", True),
+        (502, "", True),
+        (503, "", True),
+        (504, "", True),
+        (403, "rateLimitExceeded", True),
+        (403, "userRateLimitExceeded", True),
+        (403, "insufficientPermissions", False),
+        (404, "", False),
+    ],
+)
+def test_is_retryable_gmail_error(status: int, reason: str, retryable: bool) -> None:
+    assert is_retryable_gmail_error(_http_error(status, reason)) is retryable
+
+
+def test_non_http_errors_are_not_retried() -> None:
+    assert not is_retryable_gmail_error(ValueError("boom"))